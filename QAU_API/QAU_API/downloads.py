@@ -0,0 +1,287 @@
+import itertools
+import mimetypes
+import os
+import re
+import time
+import zipfile
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden, HttpResponseNotFound, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .storage import content_addressed_storage
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+# Formats that are already compressed are stored in bundles without recompression
+STORED_EXTENSIONS = {
+    ".7z", ".avi", ".docx", ".gif", ".gz", ".jpeg", ".jpg", ".mov", ".mp3", ".mp4",
+    ".odp", ".ods", ".odt", ".pdf", ".png", ".pptx", ".rar", ".webp", ".xlsx", ".zip",
+}
+
+
+def _parse_range(header, size):
+    """
+    Parse a single-range Range header into an inclusive (start, end) pair.
+
+    Returns None when the header should be ignored and the whole file sent
+    (bad syntax, first byte after the last one, or several ranges, as
+    multipart/byteranges is not supported) and "unsatisfiable" for a range
+    outside the file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return "unsatisfiable"
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    if last and start > int(last):
+        return None
+    if start >= size:
+        return "unsatisfiable"
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def _if_range_passes(request, etag, last_modified):
+    """Check if the If-Range validator (an ETag or a date) still matches the file."""
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _iter_range(file_path, start, length):
+    """Yield `length` bytes of a file starting at `start`."""
+    with open(file_path, "rb") as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, file):
+    """
+    Build the download response of a stored file, or return None if it is missing.
+
+    Depending on DOWNLOAD_BACKEND the bytes are streamed by Django ("django"),
+    or the response is left empty and the front-end web server sends the file
+    with X-Accel-Redirect ("nginx") or X-Sendfile ("sendfile").
+
+    The ETag and Last-Modified validators come from the stored file, so
+    If-None-Match / If-Modified-Since get a 304 Not Modified. The "django"
+    backend also answers single-range Range requests with 206 Partial Content
+    and sends the whole file for multiple ranges.
+    """
+    return _serve_name(request, file.storage, file.name)
+
+
+def _serve_name(request, storage, name):
+    """Build the download response of the file stored under `name` (see serve_file)."""
+    file_path = storage.path(name)
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+
+    size = stat.st_size
+    last_modified = int(stat.st_mtime)
+    etag = f'"{size:x}-{stat.st_mtime_ns:x}"'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        if response.status_code == 304:
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    backend = settings.DOWNLOAD_BACKEND
+    if backend == "nginx":
+        response = HttpResponse()
+        response["X-Accel-Redirect"] = settings.DOWNLOAD_INTERNAL_URL + quote(os.path.relpath(file_path, storage.location))
+    elif backend == "sendfile":
+        response = HttpResponse()
+        response["X-Sendfile"] = file_path
+    else:
+        byte_range = None
+        if "HTTP_RANGE" in request.META and _if_range_passes(request, etag, last_modified):
+            byte_range = _parse_range(request.META["HTTP_RANGE"], size)
+
+        if byte_range == "unsatisfiable":
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        if byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(_iter_range(file_path, start, end - start + 1), status=206)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = str(end - start + 1)
+        else:
+            response = FileResponse(open(file_path, "rb"))
+        response["Accept-Ranges"] = "bytes"
+
+    # Blob paths have no extension, the name and type come from the stored file name
+    content_type, _ = mimetypes.guess_type(name)
+    response["Content-Type"] = content_type or "application/octet-stream"
+    response["Content-Disposition"] = f'attachment; filename="{os.path.basename(name)}"'
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def _download_signature(object_id, user_id, expires, name):
+    """HMAC (keyed with SECRET_KEY) of the fields of a signed download URL."""
+    value = f"{object_id}:{user_id}:{expires}:{name}"
+    return salted_hmac("QAU_API.downloads.signed_download", value, algorithm="sha256").hexdigest()
+
+
+def signed_download_url(request, file, object_id, user, expires=None):
+    """
+    Build an absolute URL downloading a stored file without authentication
+    until `expires` (a UNIX timestamp, SIGNED_DOWNLOAD_MAX_AGE seconds from now
+    by default). Only issue it after checking that `user` may download the file.
+    """
+    expires = expires or int(time.time()) + settings.SIGNED_DOWNLOAD_MAX_AGE
+    query = urlencode(
+        {
+            "id": object_id,
+            "user": user.pk,
+            "expires": expires,
+            "signature": _download_signature(object_id, user.pk, expires, file.name),
+        }
+    )
+    return request.build_absolute_uri(reverse("signed-download", kwargs={"name": file.name})) + "?" + query
+
+
+@require_safe
+def signed_download(request, name):
+    """
+    Serve a file from a URL built by signed_download_url.
+
+    Only the signature and the expiry are checked, so the download needs no
+    authentication and no database query.
+    """
+    try:
+        expires = int(request.GET["expires"])
+        signature = _download_signature(request.GET["id"], request.GET["user"], expires, name)
+    except (KeyError, ValueError):
+        return HttpResponseForbidden("Invalid download link.")
+    if not constant_time_compare(signature, request.GET.get("signature", "")):
+        return HttpResponseForbidden("Invalid download link.")
+    if expires < time.time():
+        return HttpResponseForbidden("The download link has expired.")
+
+    response = _serve_name(request, content_addressed_storage(), name)
+    if response is None:
+        return HttpResponseNotFound("File not found.")
+    return response
+
+
+class _ZipSink:
+    """Unseekable file-like object collecting what ZipFile writes until it is drained."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _safe_name(name):
+    """Make a title usable as a single path component of an archive name."""
+    return name.replace("/", "_").replace("\\", "_").strip() or "untitled"
+
+
+def zip_entries(rows, folders, file_title):
+    """
+    Yield (arcname, file_path) entries for rows holding a stored "file" name.
+
+    Each row is placed under the folders named by the row's `folders` values
+    and named `file_title(row)` plus the file extension. Duplicate names in
+    the same folder get a " (n)" suffix.
+    """
+    seen = set()
+    for row in rows:
+        extension = os.path.splitext(row["file"])[1]
+        base = "/".join([_safe_name(row[folder]) for folder in folders] + [_safe_name(file_title(row))])
+        arcname = base + extension
+        counter = 1
+        while arcname in seen:
+            counter += 1
+            arcname = f"{base} ({counter}){extension}"
+        seen.add(arcname)
+        yield arcname, content_addressed_storage().path(row["file"])
+
+
+def file_stem(name):
+    """Get the base name of a stored file without its extension."""
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def iter_zip(entries):
+    """
+    Yield a ZIP archive of (arcname, file_path) entries as it is written.
+
+    Nothing is written to disk and only one chunk of one file is held in
+    memory at a time. Missing files are skipped.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for arcname, file_path in entries:
+            try:
+                info = zipfile.ZipInfo.from_file(file_path, arcname)
+            except FileNotFoundError:
+                continue
+            if os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS:
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+
+            with open(file_path, "rb") as source, archive.open(info, mode="w") as target:
+                while chunk := source.read(CHUNK_SIZE):
+                    target.write(chunk)
+                    if sink.chunks:
+                        yield sink.drain()
+    yield sink.drain()
+
+
+def serve_zip(entries, filename):
+    """
+    Build a streaming download response of a ZIP archive of (arcname, file_path) entries,
+    or return None if there are no entries.
+    """
+    entries = iter(entries)
+    first = next(entries, None)
+    if first is None:
+        return None
+    response = StreamingHttpResponse(iter_zip(itertools.chain([first], entries)), content_type="application/zip")
+    response["Content-Disposition"] = content_disposition_header(as_attachment=True, filename=filename)
+    return response
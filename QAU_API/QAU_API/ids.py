@@ -0,0 +1,42 @@
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_timestamp = 0
+_counter = 0
+
+# Bits of the counter that follows the timestamp (rand_a of RFC 9562)
+COUNTER_BITS = 12
+
+
+def uuid7():
+    """
+    Generate a time-ordered UUID (version 7, RFC 9562).
+
+    The first 48 bits are the Unix time in milliseconds, so ids created later
+    sort after earlier ones and inserts append to the right edge of the primary
+    key index instead of splitting random pages. Within one millisecond a
+    counter (seeded randomly) keeps the ids of this process increasing.
+    """
+    global _last_timestamp, _counter
+
+    with _lock:
+        timestamp = time.time_ns() // 1_000_000
+        if timestamp > _last_timestamp:
+            # Seed below the middle of the range to leave room for increments
+            _counter = int.from_bytes(os.urandom(2), "big") >> (16 - COUNTER_BITS + 1)
+        else:
+            timestamp = _last_timestamp
+            _counter += 1
+            if _counter >> COUNTER_BITS:
+                # Counter overflow: borrow the next millisecond
+                timestamp += 1
+                _counter = 0
+        _last_timestamp = timestamp
+        counter = _counter
+
+    random_bits = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    value = (timestamp & ((1 << 48) - 1)) << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | random_bits
+    return uuid.UUID(int=value)
@@ -0,0 +1,16 @@
+class PendingDeletionMixin:
+    """
+    Hide from a viewset the rows under an academic year or standard marked
+    for deletion, until the background worker has purged them.
+
+    `pending_deletion_lookups` lists the lookups from the model to the
+    pending_deletion flag of each ancestor (e.g. "standard__pending_deletion").
+    """
+
+    pending_deletion_lookups = []
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for lookup in self.pending_deletion_lookups:
+            queryset = queryset.exclude(**{lookup: True})
+        return queryset
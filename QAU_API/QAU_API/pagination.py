@@ -1,8 +1,255 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination on a unique ordering, e.g. ("-created_at", "-id").
+
+    Each page is fetched with a WHERE on the ordering values of the last row
+    seen instead of an OFFSET, and without a COUNT, so deep pages cost the same
+    as the first one. The cursor is an opaque token holding those values; a
+    token that cannot be decoded or compared gets a 400.
+
+    Views may set `cursor_ordering` to page on other fields; the last field
+    must make the ordering unique (the primary key).
+    """
+
+    page_size_query_param = "page_size"
+    page_size = 20
+    max_page_size = 50
+    ordering = ("-created_at", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = tuple(getattr(view, "cursor_ordering", self.ordering))
+        self.page_size = self.get_page_size(request)
+        position, reverse = self._decode_cursor(request)
+
+        # Going backwards, the rows before the cursor are fetched in the inverted ordering
+        ordering = [self._invert(field) if reverse else field for field in self.ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self._after(position, ordering))
+            except (TypeError, ValueError, ValidationError):
+                raise ParseError(self.invalid_cursor_message)
+
+        # One row more than the page tells if there is another page in this direction
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+
+        has_next = True if reverse else has_more
+        has_previous = has_more if reverse else position is not None
+        self.next_position = self._position(results[-1]) if results and has_next else None
+        self.previous_position = self._position(results[0]) if results and has_previous else None
+        return results
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self._encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self._encode_cursor(self.previous_position, reverse=True)
+
+    def _encode_cursor(self, position, reverse):
+        token = json.dumps({"p": position, "r": int(reverse)}, separators=(",", ":"))
+        token = base64.urlsafe_b64encode(token.encode()).decode().rstrip("=")
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def _decode_cursor(self, request):
+        """Return the position and direction of the cursor (None for the first page)"""
+        token = request.query_params.get(self.cursor_query_param, "")
+        if not token:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            position, reverse = cursor["p"], bool(cursor["r"])
+        except (TypeError, KeyError, ValueError, binascii.Error):
+            raise ParseError(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise ParseError(self.invalid_cursor_message)
+        return position, reverse
+
+    def _after(self, position, ordering):
+        """
+        Build the filter for the rows after `position` in `ordering`:
+        (a > x) OR (a = x AND b > y) OR ... with the comparison flipped for descending fields.
+        """
+        conditions = []
+        for index, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            equal = {ordering[i].lstrip("-"): position[i] for i in range(index)}
+            conditions.append(Q(**equal, **{f"{name}__{lookup}": position[index]}))
+        return reduce(or_, conditions)
+
+    def _position(self, instance):
+        """Read the ordering values of a row as JSON-friendly values"""
+        position = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip("-"))
+            position.append(value.isoformat() if hasattr(value, "isoformat") else str(value))
+        return position
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
 
 
 class CustomPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination, or keyset pagination when the request has a
+    `cursor` parameter (empty for the first page). Cursor pages are keyed on
+    the view's `cursor_ordering` (by default ("-created_at", "-id")) and
+    skip the ?ordering parameter.
+    """
+
     page_query_param = "page"
     page_size_query_param = "page_size"
     page_size = 20
     max_page_size = 50
+    cursor_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_pagination_class.cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        cursor_parameter = self.cursor_pagination_class().get_schema_operation_parameters(view)[0]
+        cursor_parameter["description"] = "Switch to cursor pagination (empty for the first page) with the next/previous cursor value."
+        return [*parameters, cursor_parameter]
+
+
+class EstimatedCountPage(Page):
+    """Page of an estimated count paginator, knowing from an extra row if more rows follow"""
+
+    def __init__(self, object_list, number, paginator, has_more):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        return self.has_more
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator counting exactly below PAGINATION_EXACT_COUNT_THRESHOLD rows and
+    using the PostgreSQL planner estimate (EXPLAIN) above it.
+
+    The exact count stops at the threshold, so small results never run the
+    EXPLAIN and large ones are never counted in full. With an estimated count,
+    pages are sliced without checking the count and the next page is detected
+    with one extra row, so all rows stay reachable.
+    """
+
+    @cached_property
+    def capped_count(self):
+        """The exact row count, up to PAGINATION_EXACT_COUNT_THRESHOLD"""
+        return self.object_list[: settings.PAGINATION_EXACT_COUNT_THRESHOLD].count()
+
+    @cached_property
+    def estimated_count(self):
+        """The planner row estimate of the queryset, or None where it is not available"""
+        queryset = self.object_list
+        if connections[queryset.db].vendor != "postgresql":
+            return None
+        plan = json.loads(queryset.order_by().explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    @cached_property
+    def count_is_estimate(self):
+        return self.capped_count >= settings.PAGINATION_EXACT_COUNT_THRESHOLD and self.estimated_count is not None
+
+    @cached_property
+    def count(self):
+        if self.capped_count < settings.PAGINATION_EXACT_COUNT_THRESHOLD:
+            return self.capped_count
+        if self.count_is_estimate:
+            # Stale statistics may estimate fewer rows than already counted
+            return max(self.estimated_count, self.capped_count)
+        return super().count
+
+    def validate_number(self, number):
+        if not self.count_is_estimate:
+            return super().validate_number(number)
+        # The estimate may be below the real count, so only the lower bound is checked
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        if not self.count_is_estimate:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages["no_results"])
+        return EstimatedCountPage(rows[: self.per_page], number, self, len(rows) > self.per_page)
+
+
+class EstimatedCountPagination(CustomPageNumberPagination):
+    """
+    Page number pagination for large tables: the count is exact below
+    PAGINATION_EXACT_COUNT_THRESHOLD rows and a planner estimate above it,
+    flagged with count_is_estimate.
+    """
+
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return Response(
+            {
+                "count": self.page.paginator.count,
+                "count_is_estimate": self.page.paginator.count_is_estimate,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"] = {
+            "count": response_schema["properties"]["count"],
+            "count_is_estimate": {"type": "boolean", "example": False},
+            **response_schema["properties"],
+        }
+        return response_schema
@@ -146,6 +146,36 @@ STATIC_URL = "static/"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# How attachment downloads are sent after the permission check:
+# "django" streams the file through FileResponse,
+# "nginx" returns X-Accel-Redirect to DOWNLOAD_INTERNAL_URL (an internal location aliased to MEDIA_ROOT),
+# "sendfile" returns X-Sendfile with the file path (Apache mod_xsendfile, lighttpd)
+DOWNLOAD_BACKEND = env.str("DOWNLOAD_BACKEND", default="django")
+DOWNLOAD_INTERNAL_URL = env.str("DOWNLOAD_INTERNAL_URL", default="/protected-media/")
+# Lifetime (seconds) of the signed download URLs issued by the signed-urls endpoints
+SIGNED_DOWNLOAD_MAX_AGE = env.int("SIGNED_DOWNLOAD_MAX_AGE", default=300)
+
+# Resumable uploads: sessions idle for longer than this (hours) are removed by cleanup_upload_sessions
+UPLOAD_SESSION_MAX_AGE = env.int("UPLOAD_SESSION_MAX_AGE", default=24)
+# A chunk claimed for longer than this (seconds) is considered abandoned (e.g. its process died) and can be taken over
+UPLOAD_CHUNK_TIMEOUT = env.int("UPLOAD_CHUNK_TIMEOUT", default=600)
+
+# Academic year structure
+# Years with more attachments than the threshold are streamed when no snapshot exists
+STRUCTURE_STREAM_THRESHOLD = env.int("STRUCTURE_STREAM_THRESHOLD", default=20000)
+STRUCTURE_STREAM_BATCH_SIZE = env.int("STRUCTURE_STREAM_BATCH_SIZE", default=10)
+
+# Paginated listings of large tables count exactly below this many rows (planner estimate above)
+PAGINATION_EXACT_COUNT_THRESHOLD = env.int("PAGINATION_EXACT_COUNT_THRESHOLD", default=10000)
+
+# Number of rows per INSERT when cloning an academic year
+CLONE_BATCH_SIZE = env.int("CLONE_BATCH_SIZE", default=1000)
+# Running clone jobs without a heartbeat for this long (seconds) are failed, their worker is assumed dead
+CLONE_JOB_TIMEOUT = env.int("CLONE_JOB_TIMEOUT", default=600)
+
+# Number of rows per DELETE when purging deleted academic years and standards
+DELETION_BATCH_SIZE = env.int("DELETION_BATCH_SIZE", default=1000)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,167 @@
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+from functools import cache
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+BLOB_DIR = "blobs"
+BLOB_NAME_RE = re.compile(rf"^{BLOB_DIR}/[0-9a-f]{{2}}/([0-9a-f]{{64}})/[^/]+$")
+
+# Length of the "blobs/<2 hex>/<digest>/" prefix of a blob file name
+BLOB_PREFIX_LENGTH = len(BLOB_DIR) + 1 + 2 + 1 + 64 + 1
+
+
+def blob_digest(name):
+    """Get the SHA-256 digest of a blob file name, or None for a plain file name."""
+    match = BLOB_NAME_RE.match(name or "")
+    return match.group(1) if match else None
+
+
+def file_metadata(file):
+    """
+    Get the has_file, file_size, content_type and sha256 column values of a stored file.
+
+    The checksum of a blob is its name, computed while the upload was streamed;
+    files stored before the content-addressed storage are left without one
+    (see the backfill_file_metadata command).
+    """
+    if not file:
+        return {"has_file": False, "file_size": None, "content_type": "", "sha256": ""}
+    try:
+        size = file.storage.size(file.name)
+    except OSError:
+        size = None
+    content_type, _ = mimetypes.guess_type(file.name)
+    return {
+        "has_file": True,
+        "file_size": size,
+        "content_type": content_type or "application/octet-stream",
+        "sha256": blob_digest(file.name) or "",
+    }
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage keeping a single copy of every distinct file content.
+
+    Saved files are hashed (SHA-256) while they are streamed to a temporary
+    file, then moved to blobs/<2 hex>/<digest> unless that blob already exists.
+    The returned name is blobs/<2 hex>/<digest>/<uploaded file name>, so every
+    reference keeps its own file name while identical contents share one blob.
+
+    A Blob row counts the file fields referencing each blob; deleting a name
+    releases one reference and the blob is unlinked with the last one. Names
+    stored before this storage (e.g. attachments/...) are plain files.
+    """
+
+    def blob_name(self, name):
+        """Get the name of the file holding the content of `name` in the storage."""
+        digest = blob_digest(name)
+        return f"{BLOB_DIR}/{digest[:2]}/{digest}" if digest else name
+
+    def path(self, name):
+        return super().path(self.blob_name(name))
+
+    def url(self, name):
+        return super().url(self.blob_name(name))
+
+    def get_available_name(self, name, max_length=None):
+        # Names never clash, only the file name has to fit next to the blob prefix
+        name = os.path.basename(name)
+        if max_length and BLOB_PREFIX_LENGTH + len(name) > max_length:
+            stem, extension = os.path.splitext(name)
+            name = stem[: max(max_length - BLOB_PREFIX_LENGTH - len(extension), 1)] + extension
+        return name
+
+    def _save(self, name, content):
+        blob_dir = os.path.join(self.location, BLOB_DIR)
+        os.makedirs(blob_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=blob_dir, prefix=".upload-", delete=False) as temporary:
+            try:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    size += len(chunk)
+                    temporary.write(chunk)
+            except BaseException:
+                os.unlink(temporary.name)
+                raise
+        digest = digest.hexdigest()
+
+        try:
+            self._add_reference(digest, size, temporary.name)
+        finally:
+            if os.path.exists(temporary.name):
+                os.unlink(temporary.name)
+        return f"{BLOB_DIR}/{digest[:2]}/{digest}/{name}"
+
+    def adopt(self, file_path, digest, size, name):
+        """
+        Store a file already written to disk under the storage (moved, not
+        copied) whose SHA-256 digest is known, and return its stored name.
+        """
+        try:
+            self._add_reference(digest, size, file_path)
+        finally:
+            if os.path.exists(file_path):
+                os.unlink(file_path)
+        return f"{BLOB_DIR}/{digest[:2]}/{digest}/{self.get_available_name(name, max_length=255)}"
+
+    def _add_reference(self, digest, size, file_path):
+        """Count one more reference to a blob, moving `file_path` in place if the blob is new."""
+        Blob = apps.get_model("standards", "Blob")
+        blob_path = super().path(f"{BLOB_DIR}/{digest[:2]}/{digest}")
+
+        # The row lock keeps a concurrent release from unlinking the blob in between
+        with transaction.atomic():
+            blob, created = Blob.objects.select_for_update().get_or_create(digest=digest, defaults={"size": size, "ref_count": 1})
+            if not created:
+                Blob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+            if created or not os.path.exists(blob_path):
+                for attempt in range(2):
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    try:
+                        os.replace(file_path, blob_path)
+                        break
+                    except FileNotFoundError:
+                        # The shard directory was removed by the release of another blob meanwhile
+                        if attempt:
+                            raise
+                if self.file_permissions_mode is not None:
+                    os.chmod(blob_path, self.file_permissions_mode)
+
+    def delete(self, name):
+        digest = blob_digest(name)
+        if not digest:
+            return super().delete(name)
+
+        Blob = apps.get_model("standards", "Blob")
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(digest=digest).first()
+            if blob and blob.ref_count > 1:
+                Blob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") - 1)
+                return
+            if blob:
+                blob.delete()
+            super().delete(name)
+            try:
+                # Remove the blobs/<2 hex>/ directory with its last blob
+                os.rmdir(os.path.dirname(self.path(name)))
+            except OSError:
+                pass
+
+
+@cache
+def content_addressed_storage():
+    """Storage of the attachment and course attachment files."""
+    return ContentAddressedStorage()
@@ -0,0 +1,209 @@
+import base64
+import shutil
+import tempfile
+import time
+import unittest
+import uuid
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from standards.models import Attachment
+from standards.tests import create_academic_year
+
+from . import ids
+from .downloads import _parse_range, _serve_name
+from .pagination import EstimatedCountPaginator
+
+User = get_user_model()
+
+
+class RangeTests(SimpleTestCase):
+    def test_parse_range(self):
+        cases = [
+            ("bytes=0-4", 10, (0, 4)),
+            ("bytes=5-", 10, (5, 9)),
+            ("bytes=5-100", 10, (5, 9)),
+            ("bytes=-3", 10, (7, 9)),
+            ("bytes=-30", 10, (0, 9)),
+            ("bytes=10-", 10, "unsatisfiable"),
+            ("bytes=-0", 10, "unsatisfiable"),
+            ("bytes=-5", 0, "unsatisfiable"),
+            ("bytes=0-", 0, "unsatisfiable"),
+            # Ignored: several ranges, first byte after the last one, bad syntax
+            ("bytes=1-2,4-5", 10, None),
+            ("bytes=5-2", 10, None),
+            ("bytes=15-2", 10, None),
+            ("bytes=-", 10, None),
+            ("lines=0-4", 10, None),
+        ]
+        for header, size, expected in cases:
+            with self.subTest(header=header, size=size):
+                self.assertEqual(_parse_range(header, size), expected)
+
+    def test_serve_ranges(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        storage = FileSystemStorage(location=location)
+        name = storage.save("file.txt", ContentFile(b"0123456789"))
+        factory = RequestFactory()
+
+        def get(header):
+            response = _serve_name(factory.get("/", HTTP_RANGE=header), storage, name)
+            return response.status_code, response.get("Content-Range"), b"".join(response.streaming_content)
+
+        self.assertEqual(get("bytes=2-4"), (206, "bytes 2-4/10", b"234"))
+        self.assertEqual(get("bytes=-2"), (206, "bytes 8-9/10", b"89"))
+        self.assertEqual(get("bytes=1-2,4-5"), (200, None, b"0123456789"))
+        self.assertEqual(get("bytes=5-2"), (200, None, b"0123456789"))
+        response = _serve_name(factory.get("/", HTTP_RANGE="bytes=20-"), storage, name)
+        self.assertEqual((response.status_code, response["Content-Range"]), (416, "bytes */10"))
+
+        empty = storage.save("empty.txt", ContentFile(b""))
+        response = _serve_name(factory.get("/", HTTP_RANGE="bytes=-5"), storage, empty)
+        self.assertEqual((response.status_code, response["Content-Range"]), (416, "bytes */0"))
+
+
+class Uuid7Tests(SimpleTestCase):
+    def test_format(self):
+        before = time.time_ns() // 1_000_000
+        value = ids.uuid7()
+        after = time.time_ns() // 1_000_000
+        self.assertEqual((value.version, value.variant), (7, uuid.RFC_4122))
+        self.assertTrue(before <= value.int >> 80 <= after)
+
+    def test_ids_increase(self):
+        values = [ids.uuid7() for _ in range(10000)]
+        self.assertEqual(values, sorted(set(values)))
+
+    @mock.patch.object(ids, "_counter", 0)
+    @mock.patch.object(ids, "_last_timestamp", 0)
+    def test_counter_overflow_borrows_the_next_millisecond(self):
+        """More ids than the counter holds in one millisecond keep increasing on the following milliseconds."""
+        timestamp = 1_700_000_000_000
+        with mock.patch.object(ids, "time") as clock:
+            clock.time_ns.return_value = timestamp * 1_000_000
+            values = [ids.uuid7() for _ in range(2 << ids.COUNTER_BITS)]
+        self.assertEqual(values, sorted(set(values)))
+        self.assertEqual(values[0].int >> 80, timestamp)
+        self.assertGreater(values[-1].int >> 80, timestamp)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="admin@example.com", username="admin", password="password", role=User.Role.ADMIN, is_staff=True)
+        # 16 attachments
+        create_academic_year(2024, 2)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, link):
+        """The ids of each page from `url`, following the `link` ("next" or "previous") of each page."""
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([row["id"] for row in response.data["results"]])
+            url = response.data[link]
+        return pages
+
+    def assertWalksAllRows(self):
+        expected = [str(pk) for pk in Attachment.objects.order_by("-created_at", "-id").values_list("pk", flat=True)]
+        pages = self.walk("/api/attachments/?cursor=&page_size=5", "next")
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+        # Back from the last page to the first one
+        last_page = self.client.get("/api/attachments/?cursor=&page_size=5")
+        while last_page.data["next"]:
+            last_page = self.client.get(last_page.data["next"])
+        self.assertEqual(self.walk(last_page.data["previous"], "previous"), pages[-2::-1])
+
+    def test_cursor_walks_every_row_once(self):
+        self.assertWalksAllRows()
+
+    def test_cursor_walks_rows_with_equal_created_at(self):
+        """Rows created at the same time are ordered and paged on their id."""
+        Attachment.objects.update(created_at=timezone.now())
+        self.assertWalksAllRows()
+
+    def test_invalid_cursor(self):
+        def cursor(token):
+            return base64.urlsafe_b64encode(token.encode()).decode().rstrip("=")
+
+        for token in [
+            "not a cursor",
+            cursor("[]"),
+            cursor('{"p": ["2024-01-01T00:00:00+00:00"], "r": 0}'),
+            cursor('{"p": ["yesterday", "1"], "r": 0}'),
+            cursor('{"p": ["2024-01-01T00:00:00+00:00", "not a uuid"], "r": 0}'),
+            cursor('{"p": [1, {"id": 2}], "r": 0}'),
+        ]:
+            with self.subTest(token=token):
+                response = self.client.get("/api/attachments/", {"cursor": token})
+                self.assertEqual(response.status_code, 400)
+
+
+class FixedEstimatePaginator(EstimatedCountPaginator):
+    """Paginator with a planner estimate below the real count, as with stale statistics"""
+
+    estimated_count = 3
+
+
+class EstimatedCountPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="admin@example.com", username="admin", password="password", role=User.Role.ADMIN, is_staff=True)
+        # 16 attachments
+        create_academic_year(2024, 2)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_exact_count_below_threshold(self):
+        """Below the threshold the count is exact and the planner is not asked."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/attachments/", {"page_size": 5})
+        self.assertEqual((response.data["count"], response.data["count_is_estimate"]), (16, False))
+        self.assertFalse([query for query in queries if query["sql"].startswith("EXPLAIN")])
+
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=5)
+    def test_estimated_count_reaches_every_page(self):
+        """With an estimated count, the next page is found from the extra row, past the estimate."""
+        paginator = FixedEstimatePaginator(Attachment.objects.order_by("-created_at", "-id"), 5)
+        self.assertTrue(paginator.count_is_estimate)
+        self.assertEqual(paginator.count, 5)
+
+        pages = [paginator.page(1)]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_page_number()))
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 1])
+        self.assertEqual(len({row.pk for page in pages for row in page}), 16)
+        with self.assertRaises(EmptyPage):
+            paginator.page(5)
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "The count estimate comes from the PostgreSQL planner")
+    @override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=5)
+    def test_count_is_estimate_above_threshold(self):
+        ids = []
+        url = "/api/attachments/?page_size=5"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.data["count_is_estimate"])
+            self.assertGreaterEqual(response.data["count"], 5)
+            ids += [row["id"] for row in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(sorted(ids), sorted(str(pk) for pk in Attachment.objects.values_list("pk", flat=True)))
@@ -11,9 +11,12 @@ from standards.views import (
     PointerViewSet,
     RequestViewSet,
     StandardViewSet,
+    UploadSessionViewSet,
 )
 from users.views import UserViewSet
 
+from .downloads import signed_download
+
 router = DefaultRouter()
 
 # users app
@@ -26,6 +29,7 @@ router.register(r"pointers", PointerViewSet)
 router.register(r"elements", ElementViewSet)
 router.register(r"attachments", AttachmentViewSet)
 router.register(r"requests", RequestViewSet)
+router.register(r"uploads", UploadSessionViewSet)
 
 # courses app
 router.register(r"courses", CourseViewSet)
@@ -37,6 +41,7 @@ urlpatterns = [
     path("api/", include(router.urls)),
     path("api/", include("users.auth")),
     path("api/", include("QAU_API.swagger")),
+    path("api/files/<path:name>", signed_download, name="signed-download"),
 ]
 
 # This is for serving media files during development
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 12:50
+
+import QAU_API.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_alter_course_code'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='courseattachment',
+            name='file',
+            field=models.FileField(max_length=255, storage=QAU_API.storage.content_addressed_storage, upload_to='course_files/'),
+        ),
+    ]
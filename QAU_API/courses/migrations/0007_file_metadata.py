@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-18 12:56
+
+from django.db import migrations, models
+
+
+def backfill_has_file(apps, schema_editor):
+    """Flag the rows that already have a file (the other columns are filled by backfill_file_metadata)."""
+    CourseAttachment = apps.get_model("courses", "CourseAttachment")
+    CourseAttachment.objects.exclude(file="").update(has_file=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courseattachment',
+            name='content_type',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='courseattachment',
+            name='file_size',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='courseattachment',
+            name='has_file',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='courseattachment',
+            name='sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.RunPython(backfill_has_file, migrations.RunPython.noop),
+    ]
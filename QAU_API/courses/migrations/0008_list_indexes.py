@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 13:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_file_metadata'),
+        ('standards', '0010_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['academic_year', '-created_at'], name='course_year_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='courseattachment',
+            index=models.Index(fields=['course_file', '-created_at'], name='courseatt_file_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='coursefile',
+            index=models.Index(fields=['course', '-created_at'], name='coursefile_course_created_idx'),
+        ),
+    ]
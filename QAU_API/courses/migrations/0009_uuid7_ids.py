@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 13:06
+
+import QAU_API.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='course',
+            name='id',
+            field=models.UUIDField(default=QAU_API.ids.uuid7, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='courseattachment',
+            name='id',
+            field=models.UUIDField(default=QAU_API.ids.uuid7, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='coursefile',
+            name='id',
+            field=models.UUIDField(default=QAU_API.ids.uuid7, primary_key=True, serialize=False),
+        ),
+    ]
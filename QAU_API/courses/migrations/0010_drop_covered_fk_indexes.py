@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_uuid7_ids'),
+        ('standards', '0015_drop_covered_fk_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='course',
+            name='academic_year',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='courses', to='standards.academicyear'),
+        ),
+        migrations.AlterField(
+            model_name='courseattachment',
+            name='course_file',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='course_attachments', to='courses.coursefile'),
+        ),
+        migrations.AlterField(
+            model_name='coursefile',
+            name='course',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='files', to='courses.course'),
+        ),
+    ]
@@ -1,12 +1,22 @@
-import uuid
-
 from django.contrib.auth import get_user_model
 from django.db import models
-from standards.models import AcademicYear
+from django.db.models import Count, Q
+from QAU_API.ids import uuid7
+from QAU_API.storage import content_addressed_storage
+from standards.models import AcademicYear, LoadedValuesMixin
 
 User = get_user_model()
 
 
+class CourseQuerySet(models.QuerySet):
+    def with_progress(self):
+        """Annotate the number of course files and of uploaded course attachments."""
+        return self.annotate(
+            n_of_course_files=Count("files", distinct=True),
+            n_of_course_files_uploaded=Count("files__course_attachments", filter=Q(files__course_attachments__has_file=True)),
+        )
+
+
 class Course(models.Model):
     """
     Model representing a course taught by a professor in a specific academic year.
@@ -35,8 +45,9 @@ class Course(models.Model):
         NETWORK = "NT", "Network"
         INFORMATION_SYSTEMS = "IS", "Information Systems"
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
-    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, related_name="courses")
+    id = models.UUIDField(primary_key=True, default=uuid7)
+    # Indexed by course_year_created_idx
+    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, related_name="courses", db_index=False)
     professor = models.ForeignKey(User, on_delete=models.SET_NULL, related_name="courses", null=True)
     title = models.CharField(max_length=255)
     code = models.CharField(max_length=50)
@@ -47,6 +58,8 @@ class Course(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CourseQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
@@ -54,6 +67,9 @@ class Course(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Course"
         verbose_name_plural = "Courses"
+        indexes = [
+            models.Index(fields=["academic_year", "-created_at"], name="course_year_created_idx"),
+        ]
 
 
 class CourseFile(models.Model):
@@ -61,8 +77,9 @@ class CourseFile(models.Model):
     Model representing a file associated with a course.
     """
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
-    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="files")
+    id = models.UUIDField(primary_key=True, default=uuid7)
+    # Indexed by coursefile_course_created_idx
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="files", db_index=False)
     title = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -74,16 +91,24 @@ class CourseFile(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Course File"
         verbose_name_plural = "Course Files"
+        indexes = [
+            models.Index(fields=["course", "-created_at"], name="coursefile_course_created_idx"),
+        ]
 
 
-class CourseAttachment(models.Model):
+class CourseAttachment(LoadedValuesMixin, models.Model):
     """
     Model representing an attachment associated with a course file.
     """
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
-    course_file = models.ForeignKey(CourseFile, on_delete=models.CASCADE, related_name="course_attachments")
-    file = models.FileField(upload_to="course_files/")
+    id = models.UUIDField(primary_key=True, default=uuid7)
+    # Indexed by courseatt_file_created_idx
+    course_file = models.ForeignKey(CourseFile, on_delete=models.CASCADE, related_name="course_attachments", db_index=False)
+    file = models.FileField(upload_to="course_files/", max_length=255, storage=content_addressed_storage)
+    has_file = models.BooleanField(default=False, db_index=True, editable=False)
+    file_size = models.BigIntegerField(blank=True, null=True, editable=False)
+    content_type = models.CharField(max_length=255, blank=True, editable=False)
+    sha256 = models.CharField(max_length=64, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -94,3 +119,6 @@ class CourseAttachment(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Course File Attachment"
         verbose_name_plural = "Course File Attachments"
+        indexes = [
+            models.Index(fields=["course_file", "-created_at"], name="courseatt_file_created_idx"),
+        ]
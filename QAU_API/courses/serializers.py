@@ -58,16 +58,15 @@ class CourseSerializer(serializers.ModelSerializer):
 
     def get_n_of_course_files(self, obj):
         """Get the number of course files associated with the course."""
+        if hasattr(obj, "n_of_course_files"):
+            return obj.n_of_course_files
         return obj.files.count()
 
     def get_n_of_course_files_uploaded(self, obj):
         """Get the number of course files uploaded in the course."""
-        attachments = CourseAttachment.objects.filter(course_file__course=obj)
-        count = 0
-        for attachment in attachments:
-            if attachment.file:
-                count += 1
-        return count
+        if hasattr(obj, "n_of_course_files_uploaded"):
+            return obj.n_of_course_files_uploaded
+        return CourseAttachment.objects.filter(course_file__course=obj, has_file=True).count()
 
 
 class CourseFileSerializer(serializers.ModelSerializer):
@@ -81,7 +80,8 @@ class CourseFileSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "updated_at"]
 
     def get_attachments(self, obj):
-        attachments = CourseAttachment.objects.filter(course_file=obj)
+        # Served from the prefetched course_attachments when available
+        attachments = obj.course_attachments.all()
         return CourseAttachmentSerializer(attachments, many=True, context=self.context).data
 
 
@@ -94,11 +94,19 @@ class CourseAttachmentSerializer(serializers.ModelSerializer):
             "id",
             "course_file",
             "file",
+            "has_file",
+            "file_size",
+            "content_type",
+            "sha256",
             "created_at",
             "updated_at",
         ]
         read_only_fields = [
             "id",
+            "has_file",
+            "file_size",
+            "content_type",
+            "sha256",
             "created_at",
             "updated_at",
         ]
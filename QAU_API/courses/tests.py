@@ -1,5 +1,121 @@
-import uuid
+import io
+import os
+import zipfile
 
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from standards.models import Blob
+from standards.tests import TemporaryMediaMixin, create_academic_year
+
+from .models import Course, CourseAttachment, CourseFile
+
+User = get_user_model()
+
+
+@override_settings(CLONE_BATCH_SIZE=2)
+class CopiedCourseFilesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="admin@example.com", username="admin", password="password", role=User.Role.ADMIN, is_staff=True)
+        cls.academic_year = create_academic_year(2024, 3)
+        cls.other_academic_year = create_academic_year(2025, 3)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def titles(self, course_id):
+        return sorted(CourseFile.objects.filter(course_id=course_id).values_list("title", flat=True))
+
+    def test_new_course_copies_the_files_of_the_latest_course(self):
+        latest_course = Course.objects.order_by("-created_at").first()
+        response = self.client.post(
+            "/api/courses/",
+            {
+                "academic_year": self.academic_year.pk,
+                "title": "New course",
+                "code": "NEW",
+                "level": Course.Level.FIRST,
+                "semester": Course.Semester.FIRST,
+                "credit_hours": Course.CreditHours.TWO,
+            },
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["copied_count"], 3)
+        self.assertEqual(self.titles(response.data["id"]), self.titles(latest_course.pk))
+
+    def test_new_course_file_is_copied_to_the_courses_of_the_year(self):
+        course, *other_courses = Course.objects.filter(academic_year=self.academic_year).order_by("created_at")
+        response = self.client.post("/api/course-files/", {"course": course.pk, "title": "Syllabus"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["copied_count"], len(other_courses))
+
+        self.assertEqual(CourseFile.objects.filter(title="Syllabus").count(), len(other_courses) + 1)
+        for other_course in other_courses:
+            self.assertIn("Syllabus", self.titles(other_course.pk))
+        self.assertFalse(CourseFile.objects.filter(title="Syllabus", course__academic_year=self.other_academic_year).exists())
+
+
+class CourseAttachmentBlobTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="admin@example.com", username="admin", password="password", role=User.Role.ADMIN, is_staff=True)
+        create_academic_year(2024, 1)
+        cls.course_file = CourseFile.objects.first()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_replaced_file_is_released(self):
+        """Replacing the file of a course attachment releases the old blob."""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/course-attachments/",
+                {"course_file": self.course_file.pk, "file": SimpleUploadedFile("old.pdf", b"old content")},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 201)
+        attachment_id = response.data["id"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f"/api/course-attachments/{attachment_id}/", {"file": SimpleUploadedFile("new.pdf", b"new content")}, format="multipart"
+            )
+        self.assertEqual(response.status_code, 200)
+
+        attachment = CourseAttachment.objects.get(pk=attachment_id)
+        self.assertEqual(list(Blob.objects.values_list("digest", "ref_count")), [(attachment.sha256, 1)])
+        self.assertEqual(self.blob_files(), [os.path.dirname(attachment.file.name)])
+
+
+class CourseDownloadTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="admin@example.com", username="admin", password="password", role=User.Role.ADMIN, is_staff=True)
+        create_academic_year(2024, 2)
+        cls.course_file = CourseFile.objects.order_by("created_at").select_related("course").first()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_course_bundle(self):
+        url = f"/api/courses/{self.course_file.course_id}/download/"
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/api/course-attachments/",
+                {"course_file": self.course_file.pk, "file": SimpleUploadedFile("notes.pdf", b"notes")},
+                format="multipart",
+            )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as archive:
+            self.assertEqual(archive.namelist(), [f"{self.course_file.title}/notes.pdf"])
@@ -1,9 +1,9 @@
-import os
-
 from django.conf import settings
-from django.http import FileResponse
+from django.db import transaction
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import status, viewsets
+from QAU_API.downloads import file_stem, serve_file, serve_zip, signed_download_url, zip_entries
+from QAU_API.mixins import PendingDeletionMixin
+from rest_framework import serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.filters import OrderingFilter, SearchFilter
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
@@ -18,7 +18,7 @@ from .serializers import (
 )
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(PendingDeletionMixin, viewsets.ModelViewSet):
     """
     ViewSet for Course model.
     Admin: Full CRUD operations
@@ -31,8 +31,9 @@ class CourseViewSet(viewsets.ModelViewSet):
     - Pagination
     """
 
-    queryset = Course.objects.all()
+    queryset = Course.objects.with_progress().select_related("professor")
     serializer_class = CourseSerializer
+    pending_deletion_lookups = ["academic_year__pending_deletion"]
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ["academic_year", "level", "semester", "department"]
@@ -45,27 +46,57 @@ class CourseViewSet(viewsets.ModelViewSet):
             return [IsAdminUser()]
         return [IsAuthenticated()]
 
+    def create(self, request, *args, **kwargs):
+        """Create the course and report how many course files were copied into it"""
+        response = super().create(request, *args, **kwargs)
+        response.data["copied_count"] = self.copied_count
+        return response
+
     def perform_create(self, serializer):
         """
         Override create method to automatically create course files
-        based on the latest course in database
+        based on the latest course in database.
+        The course files are inserted in bulk in the same transaction as the course.
         """
-        # First save the new course
-        new_course = serializer.save()
+        with transaction.atomic():
+            # First save the new course
+            new_course = serializer.save()
 
-        # Get the latest course before this one (to use as a template)
-        latest_course = Course.objects.exclude(id=new_course.id).order_by("-created_at").first()
-
-        if latest_course:
-            # Get all course files from that latest course
-            template_course_files = CourseFile.objects.filter(course=latest_course)
+            # Get the latest course before this one (to use as a template)
+            latest_course = Course.objects.exclude(id=new_course.id).order_by("-created_at").first()
 
             # Create similar course files for the new course
-            for template_file in template_course_files:
-                CourseFile.objects.create(course=new_course, title=template_file.title)
+            titles = CourseFile.objects.filter(course=latest_course).values_list("title", flat=True) if latest_course else []
+            course_files = [CourseFile(course=new_course, title=title) for title in titles]
+            CourseFile.objects.bulk_create(course_files, batch_size=settings.CLONE_BATCH_SIZE)
+        self.copied_count = len(course_files)
 
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        """
+        Download the uploaded course attachments of the course as a ZIP archive,
+        with one folder per course file (404 if there are none). Only the professor of the course and admins may download.
+        """
+        course = self.get_object()
+        if not (request.user.is_staff or request.user == course.professor):
+            return Response(
+                {"detail": "You do not have permission to download the files of this course."}, status=status.HTTP_403_FORBIDDEN
+            )
+
+        rows = (
+            CourseAttachment.objects.filter(course_file__course=course, has_file=True)
+            .order_by("course_file__title", "created_at")
+            .values("file", "course_file__title")
+            .iterator()
+        )
+        entries = zip_entries(rows, ["course_file__title"], lambda row: file_stem(row["file"]))
+        response = serve_zip(entries, f"{course.code}.zip")
+        if response:
+            return response
+        return Response({"detail": "No files to download."}, status=status.HTTP_404_NOT_FOUND)
 
-class CourseFileViewSet(viewsets.ModelViewSet):
+
+class CourseFileViewSet(PendingDeletionMixin, viewsets.ModelViewSet):
     """
     ViewSet for CourseFile model.
     Admin: Full CRUD operations
@@ -78,8 +109,9 @@ class CourseFileViewSet(viewsets.ModelViewSet):
     - Pagination
     """
 
-    queryset = CourseFile.objects.all()
+    queryset = CourseFile.objects.prefetch_related("course_attachments")
     serializer_class = CourseFileSerializer
+    pending_deletion_lookups = ["course__academic_year__pending_deletion"]
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ["course"]
@@ -92,28 +124,35 @@ class CourseFileViewSet(viewsets.ModelViewSet):
             return [IsAdminUser()]
         return [IsAuthenticated()]
 
+    def create(self, request, *args, **kwargs):
+        """Create the course file and report how many related courses received a copy"""
+        response = super().create(request, *args, **kwargs)
+        response.data["copied_count"] = self.copied_count
+        return response
+
     def perform_create(self, serializer):
         """
         Override create method to automatically create the same course file
-        for all courses in the same academic year
+        for all courses in the same academic year.
+        The copies are inserted in bulk in the same transaction as the original.
         """
-        # First save the original course file
-        course_file = serializer.save()
+        with transaction.atomic():
+            # First save the original course file
+            course_file = serializer.save()
 
-        # Get the course and its academic year
-        course = course_file.course
-        academic_year = course.academic_year
+            # Find all other courses from the same academic year (excluding the current one)
+            course = course_file.course
+            related_course_ids = (
+                Course.objects.filter(academic_year_id=course.academic_year_id).exclude(id=course.id).values_list("id", flat=True)
+            )
 
-        # Find all other courses from the same academic year (excluding the current one)
-        related_courses = Course.objects.filter(academic_year=academic_year).exclude(id=course.id)
+            # Create the same course file for all related courses
+            course_files = [CourseFile(course_id=course_id, title=course_file.title) for course_id in related_course_ids]
+            CourseFile.objects.bulk_create(course_files, batch_size=settings.CLONE_BATCH_SIZE)
+        self.copied_count = len(course_files)
 
-        # Create the same course file for all related courses
-        for related_course in related_courses:
-            # Create a new course file for each related course
-            CourseFile.objects.create(course=related_course, title=course_file.title)
 
-
-class CourseAttachmentViewSet(viewsets.ModelViewSet):
+class CourseAttachmentViewSet(PendingDeletionMixin, viewsets.ModelViewSet):
     """
     ViewSet for CourseAttachment model.
     Admin: Full CRUD operations
@@ -128,6 +167,7 @@ class CourseAttachmentViewSet(viewsets.ModelViewSet):
 
     queryset = CourseAttachment.objects.all()
     serializer_class = CourseAttachmentSerializer
+    pending_deletion_lookups = ["course_file__course__academic_year__pending_deletion"]
     permission_classes = [IsProfessorOfCourse | IsAdminUser]
 
     filter_backends = [DjangoFilterBackend, OrderingFilter]
@@ -136,20 +176,41 @@ class CourseAttachmentViewSet(viewsets.ModelViewSet):
     ordering = ["-created_at"]
 
     def get_permissions(self):
-        if self.action in ["retrieve", "list"]:
+        if self.action in ["retrieve", "list", "signed_urls"]:
             return [IsAuthenticated()]
 
         return [permission() for permission in self.permission_classes]
 
+    def perform_update(self, serializer):
+        """Lock the row so the replaced file is released exactly once."""
+        with transaction.atomic():
+            serializer.instance = CourseAttachment.objects.select_for_update().get(pk=serializer.instance.pk)
+            serializer.save()
+
     @action(detail=True, methods=["get"])
     def download(self, request, pk=None):
         """
         Download a course attachment file.
         """
         attachment = self.get_object()
-        file_path = os.path.join(settings.MEDIA_ROOT, attachment.file.name)
-        if os.path.exists(file_path):
-            response = FileResponse(open(file_path, "rb"))
-            response["Content-Disposition"] = f'attachment; filename="{os.path.basename(file_path)}"'
+        response = serve_file(request, attachment.file)
+        if response:
             return response
         return Response({"detail": "File not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    @action(detail=False, methods=["post"], url_path="signed-urls")
+    def signed_urls(self, request):
+        """
+        Issue short-lived signed download URLs for a list of course attachment ids ({"ids": [...]}).
+        Only the professor of the course and admins get URLs, other ids are left out.
+        """
+        ids = serializers.ListField(child=serializers.UUIDField()).run_validation(request.data.get("ids"))
+
+        attachments = self.get_queryset().filter(id__in=ids, has_file=True)
+        if not request.user.is_staff:
+            attachments = attachments.filter(course_file__course__professor=request.user)
+        urls = {
+            str(attachment.id): signed_download_url(request, attachment.file, attachment.id, request.user)
+            for attachment in attachments
+        }
+        return Response({"urls": urls})
@@ -0,0 +1,56 @@
+from django.utils.functional import cached_property
+
+from .models import Attachment, Standard
+
+
+class AccessControl:
+    """
+    Standards and attachments a user can reach, loaded once per request.
+
+    The ids of the standards the user is assigned to and of the attachments
+    shared with them are each read with one query on first use, so every
+    later membership check is a set lookup.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @classmethod
+    def for_request(cls, request):
+        """Get the AccessControl cached on the request, creating it on first use."""
+        http_request = getattr(request, "_request", request)
+        access = getattr(http_request, "_access_control", None)
+        if access is None or access.user != request.user:
+            access = cls(request.user)
+            http_request._access_control = access
+        return access
+
+    @cached_property
+    def assigned_standard_ids(self):
+        if not self.user.is_authenticated:
+            return set()
+        return set(Standard.assigned_to.through.objects.filter(user_id=self.user.pk).values_list("standard_id", flat=True))
+
+    @cached_property
+    def shared_attachment_ids(self):
+        if not self.user.is_authenticated:
+            return set()
+        return set(Attachment.shared_with.through.objects.filter(user_id=self.user.pk).values_list("attachment_id", flat=True))
+
+    def is_assigned_to_standard(self, standard_id):
+        return standard_id in self.assigned_standard_ids
+
+    def is_shared_with_attachment(self, attachment_id):
+        return attachment_id in self.shared_attachment_ids
+
+    def can_modify_attachment(self, attachment):
+        """Admins and users assigned to the attachment's standard can upload/remove its file."""
+        return self.user.is_staff or self.is_assigned_to_standard(attachment.standard_id)
+
+    def can_modify_course_file(self, course_file):
+        """Admins and the professor of the course can upload to a course file."""
+        return self.user.is_staff or course_file.course.professor_id == self.user.pk
+
+    def can_download_attachment(self, attachment):
+        """Admins, users assigned to the attachment's standard and users it is shared with can download it."""
+        return self.can_modify_attachment(attachment) or self.is_shared_with_attachment(attachment.pk)
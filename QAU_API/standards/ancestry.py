@@ -0,0 +1,35 @@
+from django.db.models import F
+
+from .models import Attachment, Element, Pointer, Standard
+
+# Models carrying copies of their standard and academic year ids, with their parent field
+ANCESTRY_PARENTS = {
+    Element: "pointer_id",
+    Attachment: "element_id",
+}
+
+
+def set_ancestry(instance):
+    """Copy the standard and academic year ids of the parent of an element or attachment."""
+    parent_pk = getattr(instance, ANCESTRY_PARENTS[type(instance)])
+    if isinstance(instance, Element):
+        parent = Pointer.objects.filter(pk=parent_pk).values("standard_id", year_id=F("standard__academic_year_id"))
+    else:
+        parent = Element.objects.filter(pk=parent_pk).values("standard_id", year_id=F("academic_year_id"))
+    ancestry = parent.first()
+    if ancestry:
+        instance.standard_id = ancestry["standard_id"]
+        instance.academic_year_id = ancestry["year_id"]
+
+
+def move_ancestry(model, instance):
+    """Update the copied ancestor ids below a re-parented element, pointer or standard."""
+    if model is Element:
+        Attachment.objects.filter(element_id=instance.pk).update(standard_id=instance.standard_id, academic_year_id=instance.academic_year_id)
+    elif model is Pointer:
+        academic_year_id = Standard.objects.filter(pk=instance.standard_id).values_list("academic_year_id", flat=True).first()
+        for descendants in [Element.objects.filter(pointer_id=instance.pk), Attachment.objects.filter(element__pointer_id=instance.pk)]:
+            descendants.update(standard_id=instance.standard_id, academic_year_id=academic_year_id)
+    elif model is Standard:
+        for descendant_model in ANCESTRY_PARENTS:
+            descendant_model.objects.filter(standard_id=instance.pk).update(academic_year_id=instance.academic_year_id)
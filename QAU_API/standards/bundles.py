@@ -0,0 +1,27 @@
+from django.db.models import Q
+from QAU_API.downloads import file_stem, zip_entries
+
+from .models import Attachment
+
+# Folder levels of a bundle, from the standard down to the element
+ATTACHMENT_FOLDERS = ["standard__title", "element__pointer__title", "element__title"]
+
+
+def attachment_entries(attachment_filter, access, depth):
+    """
+    Yield the ZIP entries of the uploaded attachments matching `attachment_filter`
+    that the user of `access` may download (staff, assigned to the standard or shared with).
+
+    `depth` is the number of levels above the attachments that the bundle
+    root covers (1 for a standard, 2 for a pointer, 3 for an element); their
+    folders are left out of the archive names.
+    """
+    attachments = Attachment.objects.filter(attachment_filter, has_file=True)
+    if not access.user.is_staff:
+        attachments = attachments.filter(
+            Q(standard_id__in=access.assigned_standard_ids) | Q(id__in=access.shared_attachment_ids)
+        )
+
+    folders = ATTACHMENT_FOLDERS[depth:]
+    rows = attachments.order_by(*folders, "title").values("file", "title", *folders).iterator()
+    return zip_entries(rows, folders, lambda row: row["title"] or file_stem(row["file"]))
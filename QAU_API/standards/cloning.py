@@ -0,0 +1,151 @@
+from courses.models import Course, CourseFile
+from django.conf import settings
+from django.db import transaction
+from QAU_API.ids import uuid7
+
+from .models import Attachment, Element, Pointer, Standard
+from .progress import recount_progress
+
+
+def _clone_level(level, model, rows, parent_field, parent_ids, build, batch_size, progress=None):
+    """
+    Clone one level of the hierarchy with bulk_create.
+
+    `rows` are the source rows (dicts) of the level, `parent_ids` maps source
+    parent ids to their clones and `build` returns the keyword arguments of
+    the clone. `progress(level, done)` is called after every written batch.
+    Returns a mapping of source ids to the pre-generated clone ids.
+    """
+    clone_ids = {}
+    objects = []
+    for row in rows:
+        clone_ids[row["id"]] = uuid7()
+        kwargs = build(row)
+        if parent_field:
+            kwargs[parent_field] = parent_ids[row[parent_field]]
+        objects.append(model(id=clone_ids[row["id"]], **kwargs))
+
+    for start in range(0, len(objects), batch_size):
+        model.objects.bulk_create(objects[start : start + batch_size])
+        if progress:
+            progress(level, min(start + batch_size, len(objects)))
+    return clone_ids
+
+
+def count_academic_year(academic_year):
+    """Count the rows per level that cloning an academic year will copy."""
+    return {
+        "standards": Standard.objects.filter(academic_year=academic_year, pending_deletion=False).count(),
+        "pointers": Pointer.objects.filter(standard__academic_year=academic_year, standard__pending_deletion=False).count(),
+        "elements": Element.objects.filter(academic_year=academic_year, standard__pending_deletion=False).count(),
+        "attachments": Attachment.objects.filter(academic_year=academic_year, standard__pending_deletion=False).count(),
+        "courses": Course.objects.filter(academic_year=academic_year).count(),
+        "course_files": CourseFile.objects.filter(course__academic_year=academic_year).count(),
+    }
+
+
+def copy_standards(source_academic_year, target_academic_year, batch_size=None, copy_assignments=False, progress=None):
+    """
+    Copy standards, pointers, elements and empty attachment placeholders
+    (no files or shares) from source to target academic year.
+    If copy_assignments is set, the assigned_to users of the standards are copied too.
+    """
+    batch_size = batch_size or settings.CLONE_BATCH_SIZE
+
+    # Rows are read oldest first so the clones keep the source ordering. Standards being deleted are skipped
+    standards = Standard.objects.filter(academic_year=source_academic_year, pending_deletion=False)
+    pointers = Pointer.objects.filter(standard__in=standards).order_by("created_at").values("id", "title", "standard_id")
+    elements = Element.objects.filter(standard__in=standards).order_by("created_at").values("id", "title", "pointer_id", "standard_id")
+    attachments = Attachment.objects.filter(standard__in=standards).order_by("created_at").values("id", "title", "element_id", "standard_id")
+
+    standard_ids = _clone_level(
+        "standards",
+        Standard,
+        standards.order_by("created_at").values("id", "title", "type"),
+        None,
+        None,
+        lambda row: {"academic_year": target_academic_year, "title": row["title"], "type": row["type"]},
+        batch_size,
+        progress,
+    )
+    pointer_ids = _clone_level("pointers", Pointer, pointers, "standard_id", standard_ids, lambda row: {"title": row["title"]}, batch_size, progress)
+
+    # bulk_create skips the signals copying the ancestor ids, so they are set here
+    def build_descendant(row):
+        return {"title": row["title"], "standard_id": standard_ids[row["standard_id"]], "academic_year": target_academic_year}
+
+    element_ids = _clone_level("elements", Element, elements, "pointer_id", pointer_ids, build_descendant, batch_size, progress)
+    attachment_ids = _clone_level("attachments", Attachment, attachments, "element_id", element_ids, build_descendant, batch_size, progress)
+
+    if copy_assignments:
+        Assignment = Standard.assigned_to.through
+        assignments = Assignment.objects.filter(standard_id__in=standard_ids).values_list("standard_id", "user_id")
+        Assignment.objects.bulk_create(
+            [Assignment(standard_id=standard_ids[standard_id], user_id=user_id) for standard_id, user_id in assignments],
+            batch_size=batch_size,
+        )
+
+    # bulk_create skips the signals maintaining the progress counters
+    recount_progress([target_academic_year])
+
+    return {
+        "standards": len(standard_ids),
+        "pointers": len(pointer_ids),
+        "elements": len(element_ids),
+        "attachments": len(attachment_ids),
+    }
+
+
+def copy_courses(source_academic_year, target_academic_year, batch_size=None, progress=None):
+    """
+    Copy courses (keeping the professor assignment) and empty course files
+    from source to target academic year. Course attachments are not copied
+    as they contain actual files.
+    """
+    batch_size = batch_size or settings.CLONE_BATCH_SIZE
+
+    courses = (
+        Course.objects.filter(academic_year=source_academic_year)
+        .order_by("created_at")
+        .values("id", "professor_id", "title", "code", "level", "semester", "credit_hours", "department")
+    )
+    course_files = CourseFile.objects.filter(course__academic_year=source_academic_year).order_by("created_at").values("id", "title", "course_id")
+
+    course_ids = _clone_level(
+        "courses",
+        Course,
+        courses,
+        None,
+        None,
+        lambda row: {
+            "academic_year": target_academic_year,
+            "professor_id": row["professor_id"],
+            "title": row["title"],
+            "code": f"{row['code']}_{target_academic_year.start_date.year}",  # Make code unique for new year
+            "level": row["level"],
+            "semester": row["semester"],
+            "credit_hours": row["credit_hours"],
+            "department": row["department"],
+        },
+        batch_size,
+        progress,
+    )
+    course_file_ids = _clone_level(
+        "course_files", CourseFile, course_files, "course_id", course_ids, lambda row: {"title": row["title"]}, batch_size, progress
+    )
+
+    return {
+        "courses": len(course_ids),
+        "course_files": len(course_file_ids),
+    }
+
+
+def clone_academic_year(source_academic_year, target_academic_year, batch_size=None, copy_assignments=False, progress=None):
+    """
+    Copy the whole structure of the source academic year into the target one
+    inside a single transaction. Returns the number of copied rows per level.
+    """
+    with transaction.atomic():
+        standards_copied = copy_standards(source_academic_year, target_academic_year, batch_size, copy_assignments, progress)
+        courses_copied = copy_courses(source_academic_year, target_academic_year, batch_size, progress)
+    return {**standards_copied, **courses_copied}
@@ -0,0 +1,129 @@
+import os
+
+from courses.models import Course, CourseAttachment, CourseFile
+from django.conf import settings
+from django.db import transaction
+
+from .models import AcademicYear, Attachment, CloneJob, Element, Pointer, Request, Standard, StructureSnapshot, UploadSession
+from .progress import adjust_progress
+from .structure import invalidate_structures
+
+
+def mark_for_deletion(obj):
+    """
+    Hide an academic year or a standard (and everything under it) at once,
+    leaving the purge to the run_year_jobs worker.
+
+    A standard's counters are taken out of its academic year right away.
+    """
+    model = type(obj)
+    model.objects.filter(pk=obj.pk).update(pending_deletion=True)
+    obj.pending_deletion = True
+
+    if model is Standard:
+        adjust_progress(AcademicYear, obj.academic_year_id, -obj.n_of_attachments, -obj.n_of_attachments_uploaded)
+        invalidate_structures(AcademicYear.objects.filter(pk=obj.academic_year_id))
+    else:
+        StructureSnapshot.objects.filter(academic_year=obj).delete()
+
+
+def _raw_delete(queryset):
+    """Delete the rows of a queryset with one DELETE, without the collector or signals."""
+    return queryset._raw_delete(queryset.db)
+
+
+def _release_files(model, ids):
+    """Release the stored files of the rows once their deletion is committed."""
+    storage = model._meta.get_field("file").storage
+    names = list(model.objects.filter(pk__in=ids, has_file=True).values_list("file", flat=True))
+
+    def release():
+        for name in names:
+            storage.delete(name)
+
+    transaction.on_commit(release)
+
+
+def _delete_upload_sessions(sessions):
+    """Delete upload sessions with their part files."""
+    for session in sessions:
+        if os.path.exists(session.part_path):
+            os.unlink(session.part_path)
+    sessions.delete()
+
+
+def _purge(queryset, batch_size, before_delete=None):
+    """
+    Delete the rows of a queryset bottom-up in batches of raw DELETEs, each in
+    its own short transaction. The collector is skipped, so `before_delete(ids)`
+    has to clear what references the rows (in the same transaction).
+    Returns the number of deleted rows.
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            if before_delete:
+                before_delete(ids)
+            deleted += _raw_delete(queryset.model.objects.filter(pk__in=ids))
+
+
+def _before_attachments_deleted(ids):
+    _delete_upload_sessions(UploadSession.objects.filter(attachment_id__in=ids))
+    Request.objects.filter(made_on_id__in=ids).update(made_on=None)
+    _raw_delete(Attachment.shared_with.through.objects.filter(attachment_id__in=ids))
+    _release_files(Attachment, ids)
+
+
+def _before_course_files_deleted(ids):
+    _delete_upload_sessions(UploadSession.objects.filter(course_file_id__in=ids))
+
+
+def _before_standards_deleted(ids):
+    _raw_delete(Standard.assigned_to.through.objects.filter(standard_id__in=ids))
+
+
+def purge_standards(standards, batch_size=None):
+    """Delete the standards of a queryset with their pointers, elements and attachments (and files)."""
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    return {
+        "attachments": _purge(
+            Attachment.objects.filter(standard__in=standards), batch_size, _before_attachments_deleted
+        ),
+        "elements": _purge(Element.objects.filter(standard__in=standards), batch_size),
+        "pointers": _purge(Pointer.objects.filter(standard__in=standards), batch_size),
+        "standards": _purge(standards, batch_size, _before_standards_deleted),
+    }
+
+
+def purge_academic_year(academic_year, batch_size=None):
+    """Delete an academic year with its standards and courses, bottom-up in batches."""
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    deleted = purge_standards(Standard.objects.filter(academic_year=academic_year), batch_size)
+
+    course_attachments = CourseAttachment.objects.filter(course_file__course__academic_year=academic_year)
+    deleted["course_attachments"] = _purge(course_attachments, batch_size, lambda ids: _release_files(CourseAttachment, ids))
+    deleted["course_files"] = _purge(CourseFile.objects.filter(course__academic_year=academic_year), batch_size, _before_course_files_deleted)
+    deleted["courses"] = _purge(Course.objects.filter(academic_year=academic_year), batch_size)
+
+    with transaction.atomic():
+        StructureSnapshot.objects.filter(academic_year=academic_year).delete()
+        CloneJob.objects.filter(source_academic_year=academic_year).update(source_academic_year=None)
+        CloneJob.objects.filter(academic_year=academic_year).update(academic_year=None)
+        _raw_delete(AcademicYear.objects.filter(pk=academic_year.pk))
+    return deleted
+
+
+def purge_pending_deletions(batch_size=None):
+    """
+    Purge every academic year and standard marked for deletion.
+    Returns the purged objects with the number of deleted rows per level.
+    """
+    purged = []
+    for standard in Standard.objects.filter(pending_deletion=True, academic_year__pending_deletion=False):
+        purged.append((standard, purge_standards(Standard.objects.filter(pk=standard.pk), batch_size)))
+    for academic_year in AcademicYear.objects.filter(pending_deletion=True):
+        purged.append((academic_year, purge_academic_year(academic_year, batch_size)))
+    return purged
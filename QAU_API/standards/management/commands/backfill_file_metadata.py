@@ -0,0 +1,58 @@
+import hashlib
+
+from courses.models import CourseAttachment
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from QAU_API.downloads import CHUNK_SIZE
+from QAU_API.storage import file_metadata
+from standards.models import Attachment
+
+METADATA_FIELDS = ["has_file", "file_size", "content_type", "sha256"]
+
+
+class Command(BaseCommand):
+    """
+    - Fill the file metadata columns of attachments and course attachments stored before they existed
+        - Flag the rows that have a file
+        - Read the size of the stored file and guess the content type from its name
+        - Hash files without a content-addressed (checksum) name
+    """
+
+    help = "Fill has_file, file_size, content_type and sha256 of existing attachments and course attachments"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows written per UPDATE batch.")
+
+    def handle(self, *args, **options):
+        for model in [Attachment, CourseAttachment]:
+            rows = model.objects.exclude(file="").filter(
+                Q(has_file=False) | Q(file_size__isnull=True) | Q(content_type="") | Q(sha256="")
+            )
+            batch, updated, missing = [], 0, 0
+            for row in rows.only("id", "file", *METADATA_FIELDS).iterator(chunk_size=options["batch_size"]):
+                metadata = file_metadata(row.file)
+                if metadata["file_size"] is None:
+                    missing += 1
+                elif not metadata["sha256"]:
+                    metadata["sha256"] = self._file_digest(row.file)
+                for field, value in metadata.items():
+                    setattr(row, field, value)
+
+                batch.append(row)
+                if len(batch) == options["batch_size"]:
+                    updated += model.objects.bulk_update(batch, METADATA_FIELDS)
+                    batch = []
+            if batch:
+                updated += model.objects.bulk_update(batch, METADATA_FIELDS)
+
+            self.stdout.write(
+                self.style.SUCCESS(f"{model._meta.verbose_name_plural}: {updated} rows updated, {missing} files missing on disk")
+            )
+
+    def _file_digest(self, file):
+        """Compute the SHA-256 digest of a stored file."""
+        digest = hashlib.sha256()
+        with file.storage.open(file.name, "rb") as content:
+            while chunk := content.read(CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
@@ -0,0 +1,112 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from QAU_API.ids import uuid7
+from standards.models import AcademicYear, Attachment, Element, Pointer, Standard
+
+GENERATORS = {"uuid4": uuid.uuid4, "uuid7": uuid7}
+
+
+class Command(BaseCommand):
+    """
+    - Compare random (v4) and time-ordered (v7) UUID primary keys on a cloned academic year
+        - For each generator, copy the standards, pointers, elements and attachments of the year
+          --rounds times into temporary tables with the same columns and indexes, with new ids,
+          in batches of CLONE_BATCH_SIZE rows
+        - Report the insert throughput and the size of the indexes (and of the primary key index)
+        - Everything runs in a transaction that is rolled back, nothing is kept
+    """
+
+    help = "Benchmark insert throughput and index size of uuid4 vs uuid7 primary keys on a cloned academic year (PostgreSQL)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--academic-year", help="Id of the academic year to clone (default: the latest one).")
+        parser.add_argument("--rounds", type=int, default=1, help="Number of times the year is copied per generator.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("The index sizes can only be measured on PostgreSQL.")
+
+        years = AcademicYear.objects.filter(pending_deletion=False)
+        if options["academic_year"]:
+            academic_year = years.filter(pk=options["academic_year"]).first()
+        else:
+            academic_year = years.order_by("-start_date").first()
+        if academic_year is None:
+            raise CommandError("No academic year to clone.")
+
+        levels = [
+            (Standard, {"academic_year": academic_year, "pending_deletion": False}),
+            (Pointer, {"standard__academic_year": academic_year, "standard__pending_deletion": False}),
+            (Element, {"academic_year": academic_year, "standard__pending_deletion": False}),
+            (Attachment, {"academic_year": academic_year, "standard__pending_deletion": False}),
+        ]
+        self.stdout.write(f"Cloning {academic_year} {options['rounds']} times per generator")
+
+        results = {}
+        with transaction.atomic():
+            for name, generator in GENERATORS.items():
+                rows = seconds = index_size = primary_key_size = 0
+                for model, lookup in levels:
+                    result = self._benchmark(model, model.objects.filter(**lookup), generator, options["rounds"])
+                    self.stdout.write(f"{name} {model._meta.verbose_name_plural}: {self._format(*result)}")
+                    rows, seconds = rows + result[0], seconds + result[1]
+                    index_size, primary_key_size = index_size + result[2], primary_key_size + result[3]
+                results[name] = (rows, seconds, index_size, primary_key_size)
+                self.stdout.write(self.style.SUCCESS(f"{name} total: {self._format(*results[name])}"))
+            transaction.set_rollback(True)
+
+        uuid4_result, uuid7_result = results["uuid4"], results["uuid7"]
+        if uuid7_result[1] and uuid4_result[2]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"uuid7 vs uuid4: {uuid4_result[1] / uuid7_result[1]:.2f}x throughput, "
+                    f"{uuid7_result[2] / uuid4_result[2]:.0%} index size"
+                )
+            )
+
+    def _benchmark(self, model, queryset, generator, rounds):
+        """
+        Insert the rows of the queryset `rounds` times with new ids into a copy of the model's table.
+        Returns the inserted rows, the seconds spent, the index size and the primary key index size.
+        """
+        fields = model._meta.concrete_fields
+        pk_index = fields.index(model._meta.pk)
+        source_rows = list(queryset.order_by("created_at").values_list(*[field.attname for field in fields]))
+
+        table = connection.ops.quote_name(f"benchmark_{model._meta.db_table}")
+        columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+        placeholders = ", ".join(["%s"] * len(fields))
+        with connection.cursor() as cursor:
+            # Same columns, defaults and indexes (no foreign keys), dropped with the rollback
+            cursor.execute(f"CREATE TEMPORARY TABLE {table} (LIKE {connection.ops.quote_name(model._meta.db_table)} INCLUDING ALL)")
+
+            start = time.perf_counter()
+            batch = []
+            for _ in range(rounds):
+                for row in source_rows:
+                    row = list(row)
+                    row[pk_index] = generator()
+                    batch.append(row)
+                    if len(batch) == settings.CLONE_BATCH_SIZE:
+                        cursor.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", batch)
+                        batch = []
+            if batch:
+                cursor.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", batch)
+            seconds = time.perf_counter() - start
+
+            cursor.execute(
+                "SELECT pg_indexes_size(%s::regclass), "
+                "(SELECT pg_relation_size(indexrelid) FROM pg_index WHERE indrelid = %s::regclass AND indisprimary)",
+                [table, table],
+            )
+            index_size, primary_key_size = cursor.fetchone()
+            cursor.execute(f"DROP TABLE {table}")
+        return len(source_rows) * rounds, seconds, index_size, primary_key_size
+
+    def _format(self, rows, seconds, index_size, primary_key_size):
+        throughput = rows / seconds if seconds else 0
+        return f"{rows} rows in {seconds:.2f}s ({throughput:.0f} rows/s), indexes {index_size // 1024} kB (primary key {primary_key_size // 1024} kB)"
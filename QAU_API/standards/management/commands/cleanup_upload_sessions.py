@@ -0,0 +1,51 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from standards.models import UploadSession
+
+
+class Command(BaseCommand):
+    """
+    - Garbage-collect abandoned resumable uploads
+        - Delete upload sessions idle for longer than --max-age hours, with their part files
+        - Delete old part files that no longer have a session
+    """
+
+    help = "Delete abandoned upload sessions and their partially uploaded files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age",
+            type=int,
+            default=settings.UPLOAD_SESSION_MAX_AGE,
+            help="Hours since the last chunk after which a session is abandoned (default: UPLOAD_SESSION_MAX_AGE).",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["max_age"])
+        expired = UploadSession.objects.filter(updated_at__lt=cutoff)
+        sessions = 0
+        for session in expired.iterator():
+            if os.path.exists(session.part_path):
+                os.unlink(session.part_path)
+            session.delete()
+            sessions += 1
+
+        # Old part files left behind by sessions deleted without their file
+        orphans = 0
+        upload_dir = os.path.join(settings.MEDIA_ROOT, "uploads")
+        if os.path.isdir(upload_dir):
+            session_ids = {str(pk) for pk in UploadSession.objects.values_list("pk", flat=True)}
+            for entry in os.scandir(upload_dir):
+                if (
+                    entry.name.endswith(".part")
+                    and entry.name[: -len(".part")] not in session_ids
+                    and entry.stat().st_mtime < cutoff.timestamp()
+                ):
+                    os.unlink(entry.path)
+                    orphans += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {sessions} abandoned upload sessions and {orphans} orphaned part files"))
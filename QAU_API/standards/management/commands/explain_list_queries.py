@@ -0,0 +1,116 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from QAU_API.urls import router
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+
+class Command(BaseCommand):
+    """
+    - Check the query plans of the list endpoints
+        - Call the list action of every router viewset as a staff user,
+          unfiltered and filtered on each filterset field (with a value from the table)
+        - EXPLAIN the page query (the SELECT with a LIMIT) of each call
+        - Report sequential scans and explicit sorts in the plans
+    - Only meaningful on a PostgreSQL database seeded with realistic row counts
+      (run ANALYZE first), as the planner scans small tables sequentially
+    """
+
+    help = "EXPLAIN the page queries of the list endpoints and report sequential scans and sorts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Exit with an error if any plan has a sequential scan or a sort.")
+        parser.add_argument("--user", help="Email of the user making the requests (default: the first staff user).")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Query plans can only be checked on PostgreSQL.")
+
+        user = self._get_user(options["user"])
+        flagged = 0
+        for prefix, viewset, basename in router.registry:
+            for params in self._list_params(viewset):
+                label = f"/api/{prefix}/" + (f"?{next(iter(params))}=…" if params else "")
+                sql = self._page_query(viewset, params, user)
+                if sql is None:
+                    self.stdout.write(f"{label}: no page query")
+                    continue
+
+                problems = self._problems(sql)
+                if problems:
+                    flagged += 1
+                    self.stdout.write(self.style.WARNING(f"{label}: {', '.join(problems)}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"{label}: OK"))
+
+        if flagged and options["check"]:
+            raise CommandError(f"{flagged} list queries scan or sort.")
+
+    def _get_user(self, email):
+        """Get the requesting user, by email or the first staff user"""
+        users = get_user_model().objects.all()
+        user = users.filter(email=email).first() if email else users.filter(is_staff=True).order_by("date_joined").first()
+        if user is None:
+            raise CommandError("No user to make the requests with.")
+        return user
+
+    def _list_params(self, viewset):
+        """The query parameters to list with: none, then each filterset field with a value from the table"""
+        yield {}
+        model = viewset.queryset.model
+        for field in getattr(viewset, "filterset_fields", []):
+            value = model.objects.exclude(**{f"{field}__isnull": True}).values_list(field, flat=True).order_by().first()
+            if value is not None:
+                yield {field: str(value)}
+
+    def _page_query(self, viewset, params, user):
+        """Call the list action and return the SQL of its page query"""
+        # The host goes into the next/previous links, so it has to be an allowed one
+        host = next((host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"), "localhost")
+        request = APIRequestFactory().get("/", params, HTTP_HOST=host)
+        force_authenticate(request, user=user)
+        view = viewset.as_view({"get": "list"})
+        table = connection.ops.quote_name(viewset.queryset.model._meta.db_table)
+
+        with CaptureQueriesContext(connection) as queries:
+            view(request)
+        for query in queries.captured_queries:
+            sql = query["sql"]
+            # The capped count of the estimated count paginators is also limited
+            if sql.startswith("SELECT") and not sql.startswith("SELECT COUNT(") and f"FROM {table}" in sql and " LIMIT " in sql:
+                return sql
+        return None
+
+    def _plan_nodes(self, sql):
+        """EXPLAIN the query and return all the nodes of its plan"""
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        result = []
+        nodes = [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(node.get("Plans", []))
+            result.append(node)
+        return result
+
+    def _problems(self, sql):
+        """EXPLAIN the query and describe its flagged plan nodes"""
+        problems = []
+        for node in self._plan_nodes(sql):
+            if node["Node Type"] == "Seq Scan":
+                problems.append(f"Seq Scan on {node['Relation Name']}")
+            elif node["Node Type"] == "Sort":
+                problems.append(f"Sort on {', '.join(node['Sort Key'])}")
+        return problems
+
+    def _index_names(self, sql):
+        """EXPLAIN the query and return the names of the indexes its plan scans"""
+        return {node["Index Name"] for node in self._plan_nodes(sql) if "Index Name" in node}
@@ -0,0 +1,90 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from QAU_API.storage import BLOB_DIR
+from standards.media import FILE_MODELS, diff_blob_references, diff_media, is_referenced
+from standards.models import Blob
+
+
+class Command(BaseCommand):
+    """
+    - Reconcile MEDIA_ROOT with the file columns of attachments and course attachments
+        - Merge the Blob rows with the blob names in the file columns (both sorted by digest)
+            - Report (and with --delete repair) wrong reference counts and unreferenced blobs
+        - Merge a sorted walk of MEDIA_ROOT with the sorted referenced paths in one pass
+            - Report (and with --delete remove) orphaned files
+            - Report referenced files missing on disk
+        - Both sides are streamed in batches, so memory does not grow with the number of files
+    """
+
+    help = "Report (or delete with --delete) orphaned media files and report missing ones"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--delete", action="store_true", help="Delete orphaned files and repair the Blob reference counts.")
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=60,
+            help="Minutes since the last modification before an orphan is deleted, to spare uploads in progress.",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000, help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        self._reconcile_blobs(options)
+        self._reconcile_files(options)
+
+    def _reconcile_blobs(self, options):
+        """Compare the Blob reference counts with the blob names stored in the file columns"""
+        mismatches = 0
+        for digest, ref_count, references in diff_blob_references(options["batch_size"]):
+            mismatches += 1
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"blob {digest}: {references} references, ref_count {ref_count}")
+            if options["delete"]:
+                self._repair_blob(digest)
+
+        action = "repaired" if options["delete"] else "found"
+        self.stdout.write(self.style.SUCCESS(f"Blob reference counts: {mismatches} mismatches {action}"))
+
+    def _repair_blob(self, digest):
+        """Recount the references of one blob under its row lock and store the count"""
+        prefix = f"{BLOB_DIR}/{digest[:2]}/{digest}/"
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(digest=digest).first()
+            references = sum(model.objects.filter(file__startswith=prefix).count() for model in FILE_MODELS)
+            if not references:
+                if blob:
+                    blob.delete()
+            elif blob:
+                Blob.objects.filter(pk=blob.pk).update(ref_count=references)
+            else:
+                path = os.path.join(settings.MEDIA_ROOT, prefix.rstrip("/"))
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                Blob.objects.create(digest=digest, size=size, ref_count=references)
+
+    def _reconcile_files(self, options):
+        """Diff the media files against the referenced paths and handle orphans"""
+        cutoff = time.time() - options["min_age"] * 60
+        orphans = orphan_bytes = deleted = missing = 0
+
+        for kind, path, stat in diff_media(settings.MEDIA_ROOT, options["batch_size"]):
+            if kind == "missing":
+                missing += 1
+                self.stdout.write(self.style.WARNING(f"missing {path}"))
+                continue
+
+            orphans += 1
+            orphan_bytes += stat.st_size
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"orphan {path} ({stat.st_size} bytes)")
+            # A recent file may belong to an upload whose row is not committed yet
+            if options["delete"] and stat.st_mtime < cutoff and not is_referenced(path):
+                os.unlink(os.path.join(settings.MEDIA_ROOT, path))
+                deleted += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Media files: {orphans} orphans ({orphan_bytes} bytes), {deleted} deleted, {missing} missing")
+        )
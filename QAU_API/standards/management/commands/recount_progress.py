@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from standards.models import AcademicYear
+from standards.progress import recount_progress
+
+
+class Command(BaseCommand):
+    """
+    - Repair drift in the attachment progress counters
+        - Recount elements from their attachments
+            - Sum pointers, standards and academic years from their children
+    """
+
+    help = "Recompute the attachment progress counters of elements, pointers, standards and academic years"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--academic-year", action="append", dest="academic_years", help="Only recount this academic year id (repeatable).")
+
+    def handle(self, *args, **options):
+        academic_years = options["academic_years"]
+        recount_progress(academic_years)
+
+        years = AcademicYear.objects.all()
+        if academic_years:
+            years = years.filter(pk__in=academic_years)
+        for year in years:
+            self.stdout.write(self.style.SUCCESS(f"{year}: {year.n_of_attachments_uploaded}/{year.n_of_attachments} attachments uploaded"))
@@ -0,0 +1,137 @@
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.utils import timezone
+from standards.cloning import clone_academic_year
+from standards.deletion import purge_pending_deletions
+from standards.models import AcademicYear, CloneJob
+from standards.serializers import AcademicYearSerializer
+
+
+class Command(BaseCommand):
+    """
+    - Run pending academic year jobs from the database
+        - Fail the running CloneJobs without a heartbeat for CLONE_JOB_TIMEOUT seconds (their worker died)
+        - Claim the oldest pending CloneJob
+            - Create the new academic year and clone the structure into it
+            - Report per-level progress while cloning, which is also the heartbeat of the job
+        - Without a pending CloneJob, purge the academic years and standards marked for deletion
+            - Delete bottom-up in batches of --batch-size rows, one short transaction per batch
+        - Sleep and poll again (unless --once is given)
+    """
+
+    help = "Run pending academic year jobs (cloning and deletion) from the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run the pending jobs and exit instead of polling.")
+        parser.add_argument("--sleep", type=float, default=5, help="Seconds to wait between polls when there is no job.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.DELETION_BATCH_SIZE,
+            help="Rows deleted per batch when purging (default: DELETION_BATCH_SIZE).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            job = self._claim_job()
+            if job:
+                self._run_clone_job(job)
+                continue
+            if self._purge_pending_deletions(options["batch_size"]):
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["sleep"])
+
+    def _claim_job(self):
+        """Mark the oldest pending job as running, skipping jobs claimed by other workers"""
+        self._fail_stale_jobs()
+        with transaction.atomic():
+            job = CloneJob.objects.select_for_update(skip_locked=True).filter(status=CloneJob.Status.PENDING).order_by("created_at").first()
+            if job:
+                job.status = CloneJob.Status.RUNNING
+                job.started_at = timezone.now()
+                job.save(update_fields=["status", "started_at", "updated_at"])
+        return job
+
+    def _fail_stale_jobs(self):
+        """Fail the running jobs whose worker stopped sending heartbeats (their clone was rolled back)"""
+        now = timezone.now()
+        stale_jobs = CloneJob.objects.filter(status=CloneJob.Status.RUNNING, updated_at__lt=now - timedelta(seconds=settings.CLONE_JOB_TIMEOUT))
+        for job_id in stale_jobs.values_list("id", flat=True):
+            # Conditional on the status and heartbeat, in case the job finished or reported progress meanwhile
+            if stale_jobs.filter(id=job_id).update(
+                status=CloneJob.Status.FAILED, error="The worker running the job stopped.", finished_at=now, updated_at=now
+            ):
+                self.stdout.write(self.style.ERROR(f"Clone job {job_id} failed: its worker stopped"))
+
+    def _run_clone_job(self, job):
+        """Create the new academic year and clone the source structure into it"""
+        self.stdout.write(f"Running clone job {job.id}")
+        progress_connection = self._progress_connection()
+
+        def progress(level, done):
+            job.progress.setdefault(level, {})["done"] = done
+            if progress_connection:
+                # The clone runs in one transaction, so progress (and the updated_at
+                # heartbeat) is written through a second connection to be visible
+                # before the clone commits
+                with progress_connection.cursor() as cursor:
+                    cursor.execute(
+                        f"UPDATE {CloneJob._meta.db_table} SET progress = %s, updated_at = %s WHERE id = %s",
+                        [json.dumps(job.progress), timezone.now(), job.id],
+                    )
+
+        try:
+            with transaction.atomic():
+                # Locked so the source cannot be marked for deletion (and purged) while it is copied
+                source_academic_year = AcademicYear.objects.select_for_update().filter(pk=job.source_academic_year_id).first()
+                if source_academic_year is None:
+                    raise ValueError("The source academic year no longer exists.")
+                if source_academic_year.pending_deletion:
+                    raise ValueError("The source academic year is being deleted.")
+
+                serializer = AcademicYearSerializer(data=job.academic_year_data)
+                serializer.is_valid(raise_exception=True)
+                academic_year = serializer.save()
+                job.copied_count = clone_academic_year(
+                    source_academic_year,
+                    academic_year,
+                    copy_assignments=job.copy_assignments,
+                    progress=progress,
+                )
+                job.academic_year = academic_year
+                job.status = CloneJob.Status.SUCCEEDED
+                job.finished_at = timezone.now()
+                job.save()
+            self.stdout.write(self.style.SUCCESS(f"Clone job {job.id} created {academic_year}"))
+        except Exception as e:
+            job.academic_year = None
+            job.copied_count = None
+            job.status = CloneJob.Status.FAILED
+            job.error = str(e)
+            job.finished_at = timezone.now()
+            job.save()
+            self.stdout.write(self.style.ERROR(f"Clone job {job.id} failed: {str(e)}"))
+        finally:
+            if progress_connection:
+                progress_connection.close()
+
+    def _purge_pending_deletions(self, batch_size):
+        """Purge the academic years and standards marked for deletion, returning whether any was found"""
+        purged = purge_pending_deletions(batch_size)
+        for obj, deleted in purged:
+            counts = ", ".join(f"{count} {level}" for level, count in deleted.items())
+            self.stdout.write(self.style.SUCCESS(f"Deleted {obj._meta.verbose_name} {obj} ({counts})"))
+        return bool(purged)
+
+    def _progress_connection(self):
+        """Open a separate connection for progress updates where concurrent writers are supported"""
+        if connection.vendor != "postgresql":
+            return None
+        return connections.create_connection(DEFAULT_DB_ALIAS)
@@ -0,0 +1,136 @@
+import heapq
+import os
+from itertools import groupby
+
+from courses.models import CourseAttachment
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.functions import Collate
+from QAU_API.storage import BLOB_DIR, blob_digest, content_addressed_storage
+
+from .models import Attachment, Blob
+
+# Models whose file column references the media files
+FILE_MODELS = [Attachment, CourseAttachment]
+
+# Directories of MEDIA_ROOT not holding stored files (part files of resumable uploads)
+SKIPPED_DIRS = {"uploads"}
+
+
+def _binary_order(field):
+    """Order by code point (not the database locale) so rows merge with the sorted directory walk."""
+    if connection.vendor == "postgresql":
+        return Collate(field, "C")
+    return F(field)
+
+
+def iter_stored_names(batch_size, blobs_only=False):
+    """Yield the file names of all file columns in code point order, in batches of `batch_size` rows."""
+    streams = []
+    for model in FILE_MODELS:
+        rows = model.objects.exclude(file="")
+        if blobs_only:
+            rows = rows.filter(file__startswith=f"{BLOB_DIR}/")
+        rows = rows.order_by(_binary_order("file")).values_list("file", flat=True)
+        streams.append(rows.iterator(chunk_size=batch_size))
+    return heapq.merge(*streams)
+
+
+def iter_referenced_paths(batch_size):
+    """
+    Yield the paths (relative to MEDIA_ROOT) of the files referenced by the
+    file columns, sorted and without duplicates. Blob names map to their blob.
+    """
+    storage = content_addressed_storage()
+    previous = None
+    for name in iter_stored_names(batch_size):
+        path = storage.blob_name(name)
+        if path != previous:
+            yield path
+            previous = path
+
+
+def iter_media_files(root, relative=""):
+    """
+    Yield the files under `root` as (relative path, stat) pairs in code point order of the paths.
+
+    Only one directory listing is held per level. Entries are sorted with
+    a trailing "/" on directories so that "a/b" comes after "a-b" like in
+    the sorted database names.
+    """
+    try:
+        entries = list(os.scandir(os.path.join(root, relative)))
+    except FileNotFoundError:
+        return
+    entries.sort(key=lambda entry: entry.name + "/" if entry.is_dir(follow_symlinks=False) else entry.name)
+    for entry in entries:
+        path = f"{relative}{entry.name}"
+        if entry.is_dir(follow_symlinks=False):
+            if not relative and entry.name in SKIPPED_DIRS:
+                continue
+            yield from iter_media_files(root, path + "/")
+        elif entry.is_file(follow_symlinks=False):
+            # Skip the temporary files of uploads being stored
+            if entry.name.startswith(".upload-"):
+                continue
+            yield path, entry.stat(follow_symlinks=False)
+
+
+def diff_media(root, batch_size):
+    """
+    Merge the sorted media files with the sorted referenced paths in one pass.
+
+    Yields ("orphan", path, stat) for files no row references and
+    ("missing", path, None) for referenced files that are not on disk.
+    """
+    files = iter_media_files(root)
+    referenced = iter_referenced_paths(batch_size)
+    file = next(files, None)
+    path = next(referenced, None)
+    while file is not None or path is not None:
+        if path is None or (file is not None and file[0] < path):
+            yield "orphan", file[0], file[1]
+            file = next(files, None)
+        elif file is None or path < file[0]:
+            yield "missing", path, None
+            path = next(referenced, None)
+        else:
+            file = next(files, None)
+            path = next(referenced, None)
+
+
+def is_referenced(path):
+    """Check if any file column references the file at `path`, e.g. since the diff started."""
+    if blob_digest(f"{path}/_"):
+        reference = Q(file__startswith=f"{path}/")
+    else:
+        reference = Q(file=path)
+    return any(model.objects.filter(reference).exists() for model in FILE_MODELS)
+
+
+def diff_blob_references(batch_size):
+    """
+    Merge the Blob rows with the blob names of the file columns, both in digest order.
+
+    Yields (digest, ref_count, references): ref_count is None for a blob
+    without a Blob row and references is 0 for an unreferenced Blob row.
+    Only mismatches are yielded.
+    """
+    # Blob names sort by digest as they start with blobs/<2 hex>/<digest>/
+    referenced = ((digest, sum(1 for _ in names)) for digest, names in groupby(iter_stored_names(batch_size, True), key=blob_digest))
+    blobs = Blob.objects.order_by(_binary_order("digest")).values_list("digest", "ref_count").iterator(chunk_size=batch_size)
+
+    reference = next(referenced, None)
+    blob = next(blobs, None)
+    while reference is not None or blob is not None:
+        if blob is None or (reference is not None and reference[0] < blob[0]):
+            yield reference[0], None, reference[1]
+            reference = next(referenced, None)
+        elif reference is None or blob[0] < reference[0]:
+            yield blob[0], blob[1], 0
+            blob = next(blobs, None)
+        else:
+            if blob[1] != reference[1]:
+                yield blob[0], blob[1], reference[1]
+            reference = next(referenced, None)
+            blob = next(blobs, None)
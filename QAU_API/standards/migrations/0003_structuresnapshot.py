@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 12:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('standards', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StructureSnapshot',
+            fields=[
+                ('academic_year', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='structure_snapshot', serialize=False, to='standards.academicyear')),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Structure Snapshot',
+                'verbose_name_plural': 'Structure Snapshots',
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-18 12:42
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('standards', '0003_structuresnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CloneJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('SUCCEEDED', 'Succeeded'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('academic_year_data', models.JSONField()),
+                ('copy_assignments', models.BooleanField(default=False)),
+                ('progress', models.JSONField(blank=True, default=dict)),
+                ('copied_count', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('academic_year', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='standards.academicyear')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='clone_jobs', to=settings.AUTH_USER_MODEL)),
+                ('source_academic_year', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='clone_jobs', to='standards.academicyear')),
+            ],
+            options={
+                'verbose_name': 'Clone Job',
+                'verbose_name_plural': 'Clone Jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2 on 2026-10-18 12:44
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_progress(apps, schema_editor):
+    """Count the existing attachments into the new progress counters."""
+    Attachment = apps.get_model("standards", "Attachment")
+    Element = apps.get_model("standards", "Element")
+    Pointer = apps.get_model("standards", "Pointer")
+    Standard = apps.get_model("standards", "Standard")
+    AcademicYear = apps.get_model("standards", "AcademicYear")
+
+    attachments = Attachment.objects.filter(element=OuterRef("pk")).values("element").annotate(
+        total=Count("pk"),
+        uploaded=Count("pk", filter=Q(file__gt="")),
+    )
+    Element.objects.update(
+        n_of_attachments=Coalesce(Subquery(attachments.values("total")), Value(0)),
+        n_of_attachments_uploaded=Coalesce(Subquery(attachments.values("uploaded")), Value(0)),
+    )
+
+    for model, children, parent_field in [(Pointer, Element, "pointer"), (Standard, Pointer, "standard"), (AcademicYear, Standard, "academic_year")]:
+        totals = children.objects.filter(**{parent_field: OuterRef("pk")}).values(parent_field)
+        model.objects.update(
+            n_of_attachments=Coalesce(Subquery(totals.annotate(total=Sum("n_of_attachments")).values("total")), Value(0)),
+            n_of_attachments_uploaded=Coalesce(Subquery(totals.annotate(total=Sum("n_of_attachments_uploaded")).values("total")), Value(0)),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('standards', '0004_clonejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='academicyear',
+            name='n_of_attachments',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='academicyear',
+            name='n_of_attachments_uploaded',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='element',
+            name='n_of_attachments',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='element',
+            name='n_of_attachments_uploaded',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pointer',
+            name='n_of_attachments',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pointer',
+            name='n_of_attachments_uploaded',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='standard',
+            name='n_of_attachments',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='standard',
+            name='n_of_attachments_uploaded',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_progress, migrations.RunPython.noop),
+    ]
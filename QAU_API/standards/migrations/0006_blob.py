@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-18 12:50
+
+import QAU_API.storage
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('standards', '0005_progress_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Blob',
+                'verbose_name_plural': 'Blobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='attachment',
+            name='file',
+            field=models.FileField(blank=True, max_length=255, storage=QAU_API.storage.content_addressed_storage, upload_to='attachments/'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('standards', '0008_file_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='academicyear',
+            name='pending_deletion',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='standard',
+            name='pending_deletion',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+    ]
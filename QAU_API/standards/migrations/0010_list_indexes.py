@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-18 13:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('standards', '0009_pending_deletion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attachment',
+            index=models.Index(fields=['element', '-created_at'], name='attachment_element_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attachment',
+            index=models.Index(fields=['-created_at', '-id'], name='attachment_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='element',
+            index=models.Index(fields=['pointer', '-created_at'], name='element_pointer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pointer',
+            index=models.Index(fields=['standard', '-created_at'], name='pointer_standard_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['receiver', 'status', '-created_at'], name='request_receiver_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['requester', 'status', '-created_at'], name='request_requester_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['-created_at', '-id'], name='request_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='standard',
+            index=models.Index(fields=['academic_year', '-created_at'], name='standard_year_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='standard',
+            index=models.Index(fields=['academic_year', 'type'], name='standard_year_type_idx'),
+        ),
+    ]
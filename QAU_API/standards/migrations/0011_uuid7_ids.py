@@ -0,0 +1,59 @@
+# Generated by Django 5.2 on 2026-10-18 13:06
+
+import QAU_API.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('standards', '0010_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='academicyear',
+            name='id',
+            field=models.UUIDField(default=QAU_API.ids.uuid7, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='attachment',
+            name='id',
+            field=models.UUIDField(default=QAU_API.ids.uuid7, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='blob',
+            name='id',
+            field=models.UUIDField(default=QAU_API.ids.uuid7, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='clonejob',
+            name='id',
+            field=models.UUIDField(default=QAU_API.ids.uuid7, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='element',
+            name='id',
+            field=models.UUIDField(default=QAU_API.ids.uuid7, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='pointer',
+            name='id',
+            field=models.UUIDField(default=QAU_API.ids.uuid7, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='request',
+            name='id',
+            field=models.UUIDField(default=QAU_API.ids.uuid7, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='standard',
+            name='id',
+            field=models.UUIDField(default=QAU_API.ids.uuid7, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='id',
+            field=models.UUIDField(default=QAU_API.ids.uuid7, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2 on 2026-10-18 13:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_ancestry(apps, schema_editor):
+    """Copy the standard and academic year ids into the existing elements, then the attachments."""
+    Pointer = apps.get_model("standards", "Pointer")
+    Element = apps.get_model("standards", "Element")
+    Attachment = apps.get_model("standards", "Attachment")
+
+    pointers = Pointer.objects.filter(pk=OuterRef("pointer_id"))
+    Element.objects.update(
+        standard_id=Subquery(pointers.values("standard_id")),
+        academic_year_id=Subquery(pointers.values("standard__academic_year_id")),
+    )
+    elements = Element.objects.filter(pk=OuterRef("element_id"))
+    Attachment.objects.update(
+        standard_id=Subquery(elements.values("standard_id")),
+        academic_year_id=Subquery(elements.values("academic_year_id")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('standards', '0011_uuid7_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='academic_year',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='standards.academicyear'),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='standard',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='standards.standard'),
+        ),
+        migrations.AddField(
+            model_name='element',
+            name='academic_year',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='standards.academicyear'),
+        ),
+        migrations.AddField(
+            model_name='element',
+            name='standard',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='standards.standard'),
+        ),
+        migrations.RunPython(backfill_ancestry, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='attachment',
+            name='academic_year',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='standards.academicyear'),
+        ),
+        migrations.AlterField(
+            model_name='attachment',
+            name='standard',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='standards.standard'),
+        ),
+        migrations.AlterField(
+            model_name='element',
+            name='academic_year',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='standards.academicyear'),
+        ),
+        migrations.AlterField(
+            model_name='element',
+            name='standard',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='standards.standard'),
+        ),
+    ]
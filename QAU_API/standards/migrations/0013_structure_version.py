@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('standards', '0012_ancestry_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='academicyear',
+            name='structure_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='structuresnapshot',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-18 15:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('standards', '0014_upload_claims'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attachment',
+            name='element',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='standards.element'),
+        ),
+        migrations.AlterField(
+            model_name='element',
+            name='pointer',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='elements', to='standards.pointer'),
+        ),
+        migrations.AlterField(
+            model_name='pointer',
+            name='standard',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='pointers', to='standards.standard'),
+        ),
+        migrations.AlterField(
+            model_name='request',
+            name='receiver',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='received_requests', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='request',
+            name='requester',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='sent_requests', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='standard',
+            name='academic_year',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='standards', to='standards.academicyear'),
+        ),
+    ]
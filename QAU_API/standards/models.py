@@ -1,26 +1,75 @@
-import uuid
+import os
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.utils import timezone
+from QAU_API.ids import uuid7
+from QAU_API.storage import content_addressed_storage
 
 User = get_user_model()
 
+PROGRESS_FIELDS = ["n_of_attachments", "n_of_attachments_uploaded"]
 
-class AcademicYear(models.Model):
+
+class LoadedValuesMixin:
+    """
+    Keep the values a model instance was loaded with in `_loaded_values`,
+    so the signals can tell what a save changes (see standards.signals).
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
+class ProgressCounters(LoadedValuesMixin, models.Model):
+    """
+    Abstract model holding attachment completion counters.
+
+    The counters are maintained with atomic F() updates (see standards.progress),
+    so they are never written back from memory when an existing row is saved.
+    """
+
+    n_of_attachments = models.IntegerField(default=0, editable=False)
+    n_of_attachments_uploaded = models.IntegerField(default=0, editable=False)
+
+    # Fields only written with F() updates
+    atomic_fields = PROGRESS_FIELDS
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields if not field.primary_key and field.name not in self.atomic_fields
+            ]
+        super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
+
+
+class AcademicYear(ProgressCounters):
     """Model representing an academic year with active/archived status."""
 
     class Status(models.TextChoices):
         ARCHIVED = "ARCHIVED", "Archived"
         ACTIVE = "ACTIVE", "Active"
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid7)
     status = models.CharField(max_length=8, choices=Status.choices)
     start_date = models.DateField()
     end_date = models.DateField()
+    # Set when deleted, the rows are then purged in the background (see standards.deletion)
+    pending_deletion = models.BooleanField(default=False, db_index=True, editable=False)
+    # Bumped on every change of the structure, a snapshot is only served for the current version
+    structure_version = models.PositiveBigIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    atomic_fields = PROGRESS_FIELDS + ["structure_version"]
+
     def __str__(self):
         return f"{self.start_date.year}-{self.end_date.year} ({self.get_status_display()})"
 
@@ -30,18 +79,20 @@ class AcademicYear(models.Model):
         verbose_name_plural = "Academic Years"
 
 
-class Standard(models.Model):
+class Standard(ProgressCounters):
     """Model representing a standard with academic/pragmatic type."""
 
     class Type(models.TextChoices):
         ACADEMIC = "ACADEMIC", "Academic"
         PRAGMATIC = "PRAGMATIC", "Pragmatic"
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
-    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, related_name="standards")
+    id = models.UUIDField(primary_key=True, default=uuid7)
+    # Indexed by standard_year_created_idx (and standard_year_type_idx)
+    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, related_name="standards", db_index=False)
     assigned_to = models.ManyToManyField(User, related_name="assigned_standards", blank=True)
     title = models.CharField(max_length=255)
     type = models.CharField(max_length=10, choices=Type.choices)
+    pending_deletion = models.BooleanField(default=False, db_index=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -52,13 +103,18 @@ class Standard(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Standard"
         verbose_name_plural = "Standards"
+        indexes = [
+            models.Index(fields=["academic_year", "-created_at"], name="standard_year_created_idx"),
+            models.Index(fields=["academic_year", "type"], name="standard_year_type_idx"),
+        ]
 
 
-class Pointer(models.Model):
+class Pointer(ProgressCounters):
     """Model representing a pointer associated with a standard."""
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
-    standard = models.ForeignKey(Standard, on_delete=models.CASCADE, related_name="pointers")
+    id = models.UUIDField(primary_key=True, default=uuid7)
+    # Indexed by pointer_standard_created_idx
+    standard = models.ForeignKey(Standard, on_delete=models.CASCADE, related_name="pointers", db_index=False)
     title = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -70,13 +126,20 @@ class Pointer(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Pointer"
         verbose_name_plural = "Pointers"
+        indexes = [
+            models.Index(fields=["standard", "-created_at"], name="pointer_standard_created_idx"),
+        ]
 
 
-class Element(models.Model):
+class Element(ProgressCounters):
     """Model representing an element associated with a pointer."""
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
-    pointer = models.ForeignKey(Pointer, on_delete=models.CASCADE, related_name="elements")
+    id = models.UUIDField(primary_key=True, default=uuid7)
+    # Indexed by element_pointer_created_idx
+    pointer = models.ForeignKey(Pointer, on_delete=models.CASCADE, related_name="elements", db_index=False)
+    # Copies of the pointer's ancestors, kept in sync on save (see standards.ancestry)
+    standard = models.ForeignKey(Standard, on_delete=models.CASCADE, related_name="+", editable=False)
+    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, related_name="+", editable=False)
     title = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -88,17 +151,28 @@ class Element(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Element"
         verbose_name_plural = "Elements"
+        indexes = [
+            models.Index(fields=["pointer", "-created_at"], name="element_pointer_created_idx"),
+        ]
 
 
-class Attachment(models.Model):
+class Attachment(LoadedValuesMixin, models.Model):
     """Model representing an attachment associated with an element."""
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
-    element = models.ForeignKey(Element, on_delete=models.CASCADE, related_name="attachments")
+    id = models.UUIDField(primary_key=True, default=uuid7)
+    # Indexed by attachment_element_created_idx
+    element = models.ForeignKey(Element, on_delete=models.CASCADE, related_name="attachments", db_index=False)
+    # Copies of the element's ancestors, kept in sync on save (see standards.ancestry)
+    standard = models.ForeignKey(Standard, on_delete=models.CASCADE, related_name="+", editable=False)
+    academic_year = models.ForeignKey(AcademicYear, on_delete=models.CASCADE, related_name="+", editable=False)
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, related_name="uploaded_attachments", blank=True, null=True)
     shared_with = models.ManyToManyField(User, related_name="shared_attachments", blank=True)
     title = models.CharField(max_length=255, blank=True)
-    file = models.FileField(upload_to="attachments/", blank=True)
+    file = models.FileField(upload_to="attachments/", blank=True, max_length=255, storage=content_addressed_storage)
+    has_file = models.BooleanField(default=False, db_index=True, editable=False)
+    file_size = models.BigIntegerField(blank=True, null=True, editable=False)
+    content_type = models.CharField(max_length=255, blank=True, editable=False)
+    sha256 = models.CharField(max_length=64, blank=True, editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -110,6 +184,10 @@ class Attachment(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Attachment"
         verbose_name_plural = "Attachments"
+        indexes = [
+            models.Index(fields=["element", "-created_at"], name="attachment_element_created_idx"),
+            models.Index(fields=["-created_at", "-id"], name="attachment_created_idx"),
+        ]
 
 
 class Request(models.Model):
@@ -121,9 +199,10 @@ class Request(models.Model):
         REJECTED = "REJECTED", "Rejected"
         CANCELED = "CANCELED", "Canceled"
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
-    requester = models.ForeignKey(User, on_delete=models.CASCADE, related_name="sent_requests")
-    receiver = models.ForeignKey(User, on_delete=models.SET_NULL, related_name="received_requests", null=True)
+    id = models.UUIDField(primary_key=True, default=uuid7)
+    # Indexed by request_requester_status_idx and request_receiver_status_idx
+    requester = models.ForeignKey(User, on_delete=models.CASCADE, related_name="sent_requests", db_index=False)
+    receiver = models.ForeignKey(User, on_delete=models.SET_NULL, related_name="received_requests", null=True, db_index=False)
     made_on = models.ForeignKey(Attachment, on_delete=models.SET_NULL, related_name="requests", null=True)
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -136,3 +215,110 @@ class Request(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Request"
         verbose_name_plural = "Requests"
+        indexes = [
+            models.Index(fields=["receiver", "status", "-created_at"], name="request_receiver_status_idx"),
+            models.Index(fields=["requester", "status", "-created_at"], name="request_requester_status_idx"),
+            models.Index(fields=["-created_at", "-id"], name="request_created_idx"),
+        ]
+
+
+class StructureSnapshot(models.Model):
+    """Model caching the rendered structure of an academic year until it changes."""
+
+    academic_year = models.OneToOneField(AcademicYear, on_delete=models.CASCADE, primary_key=True, related_name="structure_snapshot")
+    data = models.BinaryField()
+    # The structure_version of the academic year the data was built from
+    version = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Structure snapshot for {self.academic_year}"
+
+    class Meta:
+        verbose_name = "Structure Snapshot"
+        verbose_name_plural = "Structure Snapshots"
+
+
+class CloneJob(models.Model):
+    """Model representing a background job creating a new academic year from the latest one."""
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        RUNNING = "RUNNING", "Running"
+        SUCCEEDED = "SUCCEEDED", "Succeeded"
+        FAILED = "FAILED", "Failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid7)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    source_academic_year = models.ForeignKey(AcademicYear, on_delete=models.SET_NULL, related_name="clone_jobs", null=True)
+    academic_year = models.ForeignKey(AcademicYear, on_delete=models.SET_NULL, related_name="+", blank=True, null=True)
+    academic_year_data = models.JSONField()
+    copy_assignments = models.BooleanField(default=False)
+    progress = models.JSONField(default=dict, blank=True)
+    copied_count = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, related_name="clone_jobs", blank=True, null=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Clone of {self.source_academic_year} ({self.get_status_display()})"
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Clone Job"
+        verbose_name_plural = "Clone Jobs"
+
+
+class Blob(models.Model):
+    """Model counting the file fields that reference a content-addressed file (see QAU_API.storage)."""
+
+    id = models.UUIDField(primary_key=True, default=uuid7)
+    digest = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.digest} ({self.ref_count} references)"
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Blob"
+        verbose_name_plural = "Blobs"
+
+
+class UploadSession(models.Model):
+    """
+    Model representing a resumable chunked upload of an attachment file
+    (or of a new course attachment of a course file).
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid7)
+    attachment = models.ForeignKey(Attachment, on_delete=models.CASCADE, related_name="upload_sessions", blank=True, null=True)
+    course_file = models.ForeignKey("courses.CourseFile", on_delete=models.CASCADE, related_name="upload_sessions", blank=True, null=True)
+    file_name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    offset = models.BigIntegerField(default=0, editable=False)
+    # Set while a chunk is being written (see standards.uploads)
+    claimed_at = models.DateTimeField(blank=True, null=True, editable=False)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="upload_sessions")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def part_path(self):
+        """Path of the file the chunks are appended to."""
+        return os.path.join(settings.MEDIA_ROOT, "uploads", f"{self.id}.part")
+
+    def __str__(self):
+        return f"Upload of {self.file_name} ({self.offset}/{self.size})"
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Upload Session"
+        verbose_name_plural = "Upload Sessions"
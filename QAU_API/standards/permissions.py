@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from .access import AccessControl
+
 
 class IsSharedWithAttachment(permissions.BasePermission):
     """
@@ -8,7 +10,7 @@ class IsSharedWithAttachment(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         # Check if the user is authenticated and exists in the attachment's shared_with
-        return request.user.is_authenticated and request.user in obj.shared_with.all()
+        return request.user.is_authenticated and AccessControl.for_request(request).is_shared_with_attachment(obj.pk)
 
 
 class IsAssignedToStandard(permissions.BasePermission):
@@ -18,7 +20,7 @@ class IsAssignedToStandard(permissions.BasePermission):
 
     def has_object_permission(self, request, view, obj):
         # Check if the user is authenticated and exists in the standard's assigned_to
-        return request.user.is_authenticated and request.user in obj.assigned_to.all()
+        return request.user.is_authenticated and AccessControl.for_request(request).is_assigned_to_standard(obj.pk)
 
 
 class IsRequester(permissions.BasePermission):
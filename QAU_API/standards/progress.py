@@ -0,0 +1,80 @@
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import AcademicYear, Attachment, Element, Pointer, Standard
+
+# Lookups from each level to the rows whose counters include it (itself and its ancestors)
+PROGRESS_LOOKUPS = {
+    Element: [(Element, "pk"), (Pointer, "elements"), (Standard, "pointers__elements"), (AcademicYear, "standards__pointers__elements")],
+    Pointer: [(Pointer, "pk"), (Standard, "pointers"), (AcademicYear, "standards__pointers")],
+    Standard: [(Standard, "pk"), (AcademicYear, "standards")],
+    AcademicYear: [(AcademicYear, "pk")],
+}
+
+
+def adjust_progress(model, pk, n_of_attachments=0, n_of_attachments_uploaded=0):
+    """
+    Add the given deltas to the counters of a row and all its ancestors,
+    with one atomic F() update per level.
+    """
+    changes = {}
+    if n_of_attachments:
+        changes["n_of_attachments"] = F("n_of_attachments") + n_of_attachments
+    if n_of_attachments_uploaded:
+        changes["n_of_attachments_uploaded"] = F("n_of_attachments_uploaded") + n_of_attachments_uploaded
+    if not changes or pk is None:
+        return
+
+    for level, lookup in PROGRESS_LOOKUPS[model]:
+        level.objects.filter(**{lookup: pk}).update(**changes)
+
+
+def move_progress(model, pk, old_parent_pk, new_parent_pk):
+    """Move the counters of a re-parented row from its old ancestors to the new ones."""
+    counters = model.objects.filter(pk=pk).values("n_of_attachments", "n_of_attachments_uploaded").first()
+    if not counters:
+        return
+    parent_model = PROGRESS_LOOKUPS[model][1][0]
+    adjust_progress(parent_model, old_parent_pk, -counters["n_of_attachments"], -counters["n_of_attachments_uploaded"])
+    adjust_progress(parent_model, new_parent_pk, counters["n_of_attachments"], counters["n_of_attachments_uploaded"])
+
+
+def _sum_children(children, parent_field, field):
+    """Subquery summing a counter over the children of the outer row."""
+    total = children.filter(**{parent_field: OuterRef("pk")}).values(parent_field).annotate(total=Sum(field)).values("total")
+    return Coalesce(Subquery(total), Value(0))
+
+
+def recount_progress(academic_years=None):
+    """
+    Recompute all counters from the attachments, one UPDATE per level.
+
+    `academic_years` restricts the recount to the given academic years.
+    """
+    years = AcademicYear.objects.all()
+    if academic_years is not None:
+        years = years.filter(pk__in=[getattr(year, "pk", year) for year in academic_years])
+
+    attachments = (
+        Attachment.objects.filter(element=OuterRef("pk"))
+        .values("element")
+        .annotate(
+            total=Count("pk"),
+            uploaded=Count("pk", filter=Q(has_file=True)),
+        )
+    )
+    Element.objects.filter(academic_year__in=years).update(
+        n_of_attachments=Coalesce(Subquery(attachments.values("total")), Value(0)),
+        n_of_attachments_uploaded=Coalesce(Subquery(attachments.values("uploaded")), Value(0)),
+    )
+
+    for model, children, parent_field, filter_lookup in [
+        (Pointer, Element.objects.all(), "pointer", "standard__academic_year__in"),
+        (Standard, Pointer.objects.all(), "standard", "academic_year__in"),
+        # Standards being deleted no longer count towards their academic year
+        (AcademicYear, Standard.objects.filter(pending_deletion=False), "academic_year", "pk__in"),
+    ]:
+        model.objects.filter(**{filter_lookup: years}).update(
+            n_of_attachments=_sum_children(children, parent_field, "n_of_attachments"),
+            n_of_attachments_uploaded=_sum_children(children, parent_field, "n_of_attachments_uploaded"),
+        )
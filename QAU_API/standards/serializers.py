@@ -1,7 +1,8 @@
+from courses.models import CourseFile
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
-from .models import AcademicYear, Attachment, Element, Pointer, Request, Standard
+from .models import AcademicYear, Attachment, CloneJob, Element, Pointer, Request, Standard, UploadSession
 
 User = get_user_model()
 
@@ -20,8 +21,17 @@ class AcademicYearSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = AcademicYear
-        fields = ["id", "status", "start_date", "end_date", "created_at", "updated_at"]
-        read_only_fields = ["id", "created_at", "updated_at"]
+        fields = [
+            "id",
+            "status",
+            "start_date",
+            "end_date",
+            "n_of_attachments",
+            "n_of_attachments_uploaded",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = ["id", "n_of_attachments", "n_of_attachments_uploaded", "created_at", "updated_at"]
 
     def validate(self, data):
         """Validate that start_date is before end_date."""
@@ -31,6 +41,70 @@ class AcademicYearSerializer(serializers.ModelSerializer):
         return data
 
 
+class CloneJobSerializer(serializers.ModelSerializer):
+    """Serializer for CloneJob model."""
+
+    academic_year = AcademicYearSerializer(read_only=True)
+
+    class Meta:
+        model = CloneJob
+        fields = [
+            "id",
+            "status",
+            "source_academic_year",
+            "academic_year",
+            "copy_assignments",
+            "progress",
+            "copied_count",
+            "error",
+            "started_at",
+            "finished_at",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for UploadSession model."""
+
+    # Attachments and course files pending deletion cannot be uploaded to
+    attachment = serializers.PrimaryKeyRelatedField(
+        queryset=Attachment.objects.filter(standard__pending_deletion=False, academic_year__pending_deletion=False),
+        required=False,
+        allow_null=True,
+    )
+    course_file = serializers.PrimaryKeyRelatedField(
+        queryset=CourseFile.objects.filter(course__academic_year__pending_deletion=False),
+        required=False,
+        allow_null=True,
+    )
+
+    class Meta:
+        model = UploadSession
+        fields = ["id", "attachment", "course_file", "file_name", "size", "sha256", "offset", "created_at", "updated_at"]
+        read_only_fields = ["id", "offset", "created_at", "updated_at"]
+
+    def validate_size(self, value):
+        """Validate that the file is not empty."""
+        if value <= 0:
+            raise serializers.ValidationError("Size must be positive.")
+        return value
+
+    def validate_sha256(self, value):
+        """Validate that the checksum is a hex SHA-256 digest."""
+        value = value.lower()
+        if len(value) != 64 or any(c not in "0123456789abcdef" for c in value):
+            raise serializers.ValidationError("Enter a hex SHA-256 digest.")
+        return value
+
+    def validate(self, data):
+        """Validate that exactly one of attachment and course_file is given."""
+        if bool(data.get("attachment")) == bool(data.get("course_file")):
+            raise serializers.ValidationError("Provide either an attachment or a course file.")
+        return data
+
+
 class StandardSerializer(serializers.ModelSerializer):
     """Serializer for Standard model."""
 
@@ -43,9 +117,6 @@ class StandardSerializer(serializers.ModelSerializer):
         source="assigned_to",
     )
 
-    n_of_attachments = serializers.SerializerMethodField()
-    n_of_attachments_uploaded = serializers.SerializerMethodField()
-
     class Meta:
         model = Standard
         fields = [
@@ -60,70 +131,25 @@ class StandardSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "created_at", "updated_at"]
-
-    def get_n_of_attachments(self, obj):
-        """Get the number of attachments for the standard."""
-        return Attachment.objects.filter(element__pointer__standard=obj).count()
-
-    def get_n_of_attachments_uploaded(self, obj):
-        """Get the number of attachments uploaded in the standard."""
-        attachments = Attachment.objects.filter(element__pointer__standard=obj)
-        count = 0
-        for attachment in attachments:
-            if attachment.file:
-                count += 1
-        return count
+        read_only_fields = ["id", "n_of_attachments", "n_of_attachments_uploaded", "created_at", "updated_at"]
 
 
 class PointerSerializer(serializers.ModelSerializer):
     """Serializer for Pointer model."""
 
-    n_of_attachments = serializers.SerializerMethodField()
-    n_of_attachments_uploaded = serializers.SerializerMethodField()
-
     class Meta:
         model = Pointer
         fields = ["id", "title", "standard", "created_at", "updated_at", "n_of_attachments", "n_of_attachments_uploaded"]
-        read_only_fields = ["id", "created_at", "updated_at"]
-
-    def get_n_of_attachments(self, obj):
-        """Get the number of attachments for the pointer."""
-        return Attachment.objects.filter(element__pointer=obj).count()
-
-    def get_n_of_attachments_uploaded(self, obj):
-        """Get the number of attachments uploaded in the pointer."""
-        attachments = Attachment.objects.filter(element__pointer=obj)
-        count = 0
-        for attachment in attachments:
-            if attachment.file:
-                count += 1
-        return count
+        read_only_fields = ["id", "n_of_attachments", "n_of_attachments_uploaded", "created_at", "updated_at"]
 
 
 class ElementSerializer(serializers.ModelSerializer):
     """Serializer for Element model."""
 
-    n_of_attachments = serializers.SerializerMethodField()
-    n_of_attachments_uploaded = serializers.SerializerMethodField()
-
     class Meta:
         model = Element
         fields = ["id", "title", "pointer", "created_at", "updated_at", "n_of_attachments", "n_of_attachments_uploaded"]
-        read_only_fields = ["id", "created_at", "updated_at"]
-
-    def get_n_of_attachments(self, obj):
-        """Get the number of attachments for the element."""
-        return Attachment.objects.filter(element=obj).count()
-
-    def get_n_of_attachments_uploaded(self, obj):
-        """Get the number of attachments uploaded in the element."""
-        attachments = Attachment.objects.filter(element=obj)
-        count = 0
-        for attachment in attachments:
-            if attachment.file:
-                count += 1
-        return count
+        read_only_fields = ["id", "n_of_attachments", "n_of_attachments_uploaded", "created_at", "updated_at"]
 
 
 class AttachmentSerializer(serializers.ModelSerializer):
@@ -145,6 +171,10 @@ class AttachmentSerializer(serializers.ModelSerializer):
             "id",
             "title",
             "file",
+            "has_file",
+            "file_size",
+            "content_type",
+            "sha256",
             "element",
             "uploaded_by",
             "shared_with",
@@ -155,6 +185,10 @@ class AttachmentSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = [
             "id",
+            "has_file",
+            "file_size",
+            "content_type",
+            "sha256",
             "uploaded_by",
             "uploaded_at",
             "created_at",
@@ -0,0 +1,161 @@
+from courses.models import Course, CourseAttachment, CourseFile
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from QAU_API.storage import file_metadata
+
+from .ancestry import ANCESTRY_PARENTS, move_ancestry, set_ancestry
+from .models import AcademicYear, Attachment, Element, Pointer, Standard
+from .progress import adjust_progress, move_progress
+from .structure import invalidate_structures
+
+# Lookup from the academic year to each model's attribute identifying the year its structure belongs to
+STRUCTURE_LOOKUPS = {
+    AcademicYear: ("pk", "pk"),
+    Standard: ("pk", "academic_year_id"),
+    Pointer: ("standards", "standard_id"),
+    Element: ("pk", "academic_year_id"),
+    Attachment: ("pk", "academic_year_id"),
+    Course: ("pk", "academic_year_id"),
+    CourseFile: ("courses", "course_id"),
+    CourseAttachment: ("courses__files", "course_file_id"),
+}
+
+
+def invalidate_structure_snapshot(instance):
+    """
+    Invalidate the structure snapshot of the academic year the instance belongs to,
+    and of the year it belonged to when loaded if it was moved.
+    """
+    lookup, attribute = STRUCTURE_LOOKUPS[type(instance)]
+    values = {getattr(instance, attribute)}
+    loaded = getattr(instance, "_loaded_values", None)
+    if loaded is not None and attribute in loaded:
+        values.add(loaded[attribute])
+    invalidate_structures(AcademicYear.objects.filter(**{f"{lookup}__in": values}))
+
+
+def structure_changed(sender, instance, **kwargs):
+    """Invalidate the structure snapshot when any part of the structure changes."""
+    invalidate_structure_snapshot(instance)
+
+
+for model in STRUCTURE_LOOKUPS:
+    post_save.connect(structure_changed, sender=model, dispatch_uid=f"structure_saved_{model._meta.label}")
+    post_delete.connect(structure_changed, sender=model, dispatch_uid=f"structure_deleted_{model._meta.label}")
+
+
+def attachment_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    Keep the progress counters in line with a created, re-parented or (un)uploaded attachment.
+    The writers lock the attachment row before loading it (see AttachmentViewSet and
+    standards.uploads), so the change is computed from its committed state.
+    """
+    if raw:
+        return
+    has_file = int(bool(instance.file))
+    loaded = getattr(instance, "_loaded_values", None)
+
+    if created:
+        adjust_progress(Element, instance.element_id, 1, has_file)
+    elif loaded is not None:
+        had_file = int(bool(loaded.get("file", instance.file)))
+        old_element_id = loaded.get("element_id", instance.element_id)
+        if old_element_id != instance.element_id:
+            adjust_progress(Element, old_element_id, -1, -had_file)
+            adjust_progress(Element, instance.element_id, 1, has_file)
+        elif had_file != has_file:
+            adjust_progress(Element, instance.element_id, 0, has_file - had_file)
+
+    # The saved state is the reference for the next save of this instance
+    instance._loaded_values = {**(loaded or {}), "element_id": instance.element_id, "file": instance.file.name}
+
+
+def attachment_deleted(sender, instance, **kwargs):
+    """Remove a deleted attachment from the progress counters."""
+    adjust_progress(Element, instance.element_id, -1, -int(bool(instance.file)))
+
+
+def parent_changed(sender, instance, created, raw=False, **kwargs):
+    """Move the progress counters and the copied ancestor ids below a re-parented element, pointer or standard."""
+    if raw:
+        return
+    parent_field = PARENT_FIELDS[sender]
+    loaded = getattr(instance, "_loaded_values", None)
+    if not created and loaded is not None:
+        old_parent_pk = loaded.get(parent_field, getattr(instance, parent_field))
+        if old_parent_pk != getattr(instance, parent_field):
+            move_progress(sender, instance.pk, old_parent_pk, getattr(instance, parent_field))
+            move_ancestry(sender, instance)
+    instance._loaded_values = {**(loaded or {}), parent_field: getattr(instance, parent_field)}
+
+
+PARENT_FIELDS = {
+    Element: "pointer_id",
+    Pointer: "standard_id",
+    Standard: "academic_year_id",
+}
+
+post_save.connect(attachment_saved, sender=Attachment, dispatch_uid="progress_attachment_saved")
+post_delete.connect(attachment_deleted, sender=Attachment, dispatch_uid="progress_attachment_deleted")
+for model in PARENT_FIELDS:
+    post_save.connect(parent_changed, sender=model, dispatch_uid=f"progress_parent_changed_{model._meta.label}")
+
+
+def ancestry_changed(sender, instance, raw=False, **kwargs):
+    """Copy the standard and academic year ids into a new or re-parented element or attachment."""
+    if raw:
+        return
+    parent_field = ANCESTRY_PARENTS[sender]
+    loaded = getattr(instance, "_loaded_values", None)
+    if instance._state.adding or (loaded is not None and loaded.get(parent_field, getattr(instance, parent_field)) != getattr(instance, parent_field)):
+        set_ancestry(instance)
+
+
+for model in ANCESTRY_PARENTS:
+    pre_save.connect(ancestry_changed, sender=model, dispatch_uid=f"ancestry_changed_{model._meta.label}")
+
+
+def release_file(file, name):
+    """Release a stored file once the transaction replacing or deleting it is committed."""
+    storage = file.storage
+    transaction.on_commit(lambda: storage.delete(name))
+
+
+def file_changed(sender, instance, raw=False, **kwargs):
+    """
+    Fill the metadata columns of an attachment whose file was uploaded or removed,
+    and release the file it replaced.
+    """
+    if raw:
+        return
+    file = instance.file
+    if file and not file._committed:
+        # Store the upload now (FileField.pre_save would right after) to know its blob
+        file.save(file.name, file.file, save=False)
+
+    loaded = getattr(instance, "_loaded_values", None)
+    if loaded is None or loaded.get("file") != file.name:
+        for field, value in file_metadata(file).items():
+            setattr(instance, field, value)
+        # The loaded state is only the committed one if the row was locked when loading
+        if loaded is not None and loaded.get("file"):
+            release_file(file, loaded["file"])
+
+
+def file_saved(sender, instance, raw=False, **kwargs):
+    """Record the saved file as the reference for the next save of this instance."""
+    if raw:
+        return
+    instance._loaded_values = {**(getattr(instance, "_loaded_values", None) or {}), "file": instance.file.name}
+
+
+def file_deleted(sender, instance, **kwargs):
+    """Release the stored file of a deleted attachment once the deletion is committed."""
+    if instance.file:
+        release_file(instance.file, instance.file.name)
+
+
+for model in [Attachment, CourseAttachment]:
+    pre_save.connect(file_changed, sender=model, dispatch_uid=f"file_changed_{model._meta.label}")
+    post_save.connect(file_saved, sender=model, dispatch_uid=f"file_saved_{model._meta.label}")
+    post_delete.connect(file_deleted, sender=model, dispatch_uid=f"file_deleted_{model._meta.label}")
@@ -0,0 +1,184 @@
+from collections import defaultdict
+
+from courses.models import Course, CourseAttachment, CourseFile
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from rest_framework.renderers import JSONRenderer
+
+from .models import AcademicYear, Attachment, Element, Pointer, Standard, StructureSnapshot
+
+
+def build_academic_year(academic_year):
+    """Build the header of an academic year structure."""
+    return {
+        "id": academic_year.id,
+        "start_date": academic_year.start_date,
+        "end_date": academic_year.end_date,
+        "status": academic_year.status,
+    }
+
+
+def build_standards(standard_filter):
+    """
+    Build the nested standards -> pointers -> elements -> attachments list.
+
+    Runs one column-projected query per level, whatever the size of the tree,
+    and assembles the nesting in memory. `standard_filter` is a Q object
+    applied to the standards (e.g. Q(academic_year=year)).
+    """
+    standards = list(Standard.objects.filter(standard_filter).values("id", "title", "type"))
+    standard_ids = [standard["id"] for standard in standards]
+
+    pointers = Pointer.objects.filter(standard_id__in=standard_ids).values("id", "title", "standard_id")
+    elements = Element.objects.filter(standard_id__in=standard_ids).values("id", "title", "pointer_id")
+    attachments = Attachment.objects.filter(standard_id__in=standard_ids).values("id", "title", "has_file", "element_id")
+
+    # Group each level under its parent id, keeping the model ordering
+    attachments_by_element = defaultdict(list)
+    for attachment in attachments:
+        attachments_by_element[attachment["element_id"]].append(
+            {"id": attachment["id"], "title": attachment["title"], "has_file": attachment["has_file"]}
+        )
+
+    elements_by_pointer = defaultdict(list)
+    for element in elements:
+        elements_by_pointer[element["pointer_id"]].append(
+            {"id": element["id"], "title": element["title"], "attachments": attachments_by_element[element["id"]]}
+        )
+
+    pointers_by_standard = defaultdict(list)
+    for pointer in pointers:
+        pointers_by_standard[pointer["standard_id"]].append(
+            {"id": pointer["id"], "title": pointer["title"], "elements": elements_by_pointer[pointer["id"]]}
+        )
+
+    return [
+        {"id": standard["id"], "title": standard["title"], "type": standard["type"], "pointers": pointers_by_standard[standard["id"]]}
+        for standard in standards
+    ]
+
+
+def build_courses(course_filter):
+    """
+    Build the nested courses -> course files list.
+
+    Runs one query for the courses and one for their course files.
+    `course_filter` is a Q object applied to the courses.
+    """
+    courses = list(
+        Course.objects.filter(course_filter).values("id", "title", "code", "level", "semester", "credit_hours", "department")
+    )
+    course_ids = [course["id"] for course in courses]
+
+    uploaded = CourseAttachment.objects.filter(course_file=OuterRef("pk"), has_file=True)
+    course_files = (
+        CourseFile.objects.filter(course_id__in=course_ids)
+        .annotate(has_file=Exists(uploaded))
+        .values("id", "title", "course_id", "has_file")
+    )
+
+    course_files_by_course = defaultdict(list)
+    for course_file in course_files:
+        course_files_by_course[course_file["course_id"]].append(
+            {"id": course_file["id"], "title": course_file["title"], "has_file": course_file["has_file"]}
+        )
+
+    return [{**course, "course_files": course_files_by_course[course["id"]]} for course in courses]
+
+
+def build_structure(academic_year):
+    """Build the complete hierarchical structure of an academic year."""
+    return {
+        "academic_year": build_academic_year(academic_year),
+        "standards": build_standards(Q(academic_year=academic_year, pending_deletion=False)),
+        "courses": build_courses(Q(academic_year=academic_year)),
+    }
+
+
+def invalidate_structures(academic_years):
+    """Bump the structure version of a queryset of academic years, so their snapshots are no longer served."""
+    academic_years.update(structure_version=F("structure_version") + 1)
+
+
+def get_structure_snapshot(academic_year, build=True):
+    """
+    Return the rendered JSON structure of an academic year.
+
+    The rendered bytes are stored in a StructureSnapshot with the structure
+    version of the year and served while the version matches, so the tree is
+    only rebuilt on the first read after a change. With build=False, None is
+    returned on a miss.
+    """
+    version, snapshot_version, data = (
+        AcademicYear.objects.filter(pk=academic_year.pk)
+        .values_list("structure_version", "structure_snapshot__version", "structure_snapshot__data")
+        .get()
+    )
+    if data is not None and snapshot_version == version:
+        return bytes(data)
+    if not build:
+        return None
+
+    # The version is read before the tree, so a change committed while building
+    # leaves the stored snapshot behind the year's version (it is never served)
+    data = JSONRenderer().render(build_structure(academic_year))
+    if not StructureSnapshot.objects.filter(academic_year=academic_year, version__lte=version).update(data=data, version=version):
+        try:
+            with transaction.atomic():
+                StructureSnapshot.objects.create(academic_year=academic_year, data=data, version=version)
+        except IntegrityError:
+            # A snapshot of a newer version was stored meanwhile
+            pass
+    return bytes(data)
+
+
+def is_large_structure(academic_year):
+    """Check if an academic year has more attachments than STRUCTURE_STREAM_THRESHOLD."""
+    attachments = Attachment.objects.filter(academic_year=academic_year, standard__pending_deletion=False)
+    return attachments.count() > settings.STRUCTURE_STREAM_THRESHOLD
+
+
+def _iter_batches(queryset, batch_size):
+    """Yield lists of primary keys, reading them through a server-side cursor."""
+    batch = []
+    for pk in queryset.values_list("pk", flat=True).iterator(chunk_size=batch_size):
+        batch.append(pk)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _iter_json_array(items):
+    """Yield a JSON array one rendered item at a time."""
+    renderer = JSONRenderer()
+    separator = b""
+    yield b"["
+    for item in items:
+        yield separator + renderer.render(item)
+        separator = b","
+    yield b"]"
+
+
+def iter_structure(academic_year, batch_size=None):
+    """
+    Yield the JSON structure of an academic year in chunks.
+
+    Standards and courses are walked in batches of `batch_size` with the same
+    per-level queries as build_structure, so memory stays bounded by a batch
+    no matter how big the year is.
+    """
+    batch_size = batch_size or settings.STRUCTURE_STREAM_BATCH_SIZE
+    standards = Standard.objects.filter(academic_year=academic_year, pending_deletion=False)
+    courses = Course.objects.filter(academic_year=academic_year)
+
+    yield b'{"academic_year":' + JSONRenderer().render(build_academic_year(academic_year))
+    yield b',"standards":'
+    yield from _iter_json_array(
+        standard for batch in _iter_batches(standards, batch_size) for standard in build_standards(Q(pk__in=batch))
+    )
+    yield b',"courses":'
+    yield from _iter_json_array(course for batch in _iter_batches(courses, batch_size) for course in build_courses(Q(pk__in=batch)))
+    yield b"}"
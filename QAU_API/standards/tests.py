@@ -1,3 +1,758 @@
-from django.test import TestCase
+import datetime
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import zipfile
+from unittest import mock
+from urllib.parse import parse_qsl, urlsplit
 
-# Create your tests here.
+from courses.models import Course, CourseAttachment, CourseFile
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from QAU_API.downloads import signed_download_url
+from QAU_API.urls import router
+from rest_framework.test import APIClient
+
+from .cloning import clone_academic_year, count_academic_year
+from .deletion import mark_for_deletion, purge_pending_deletions
+from .management.commands.explain_list_queries import Command as ExplainListQueriesCommand
+from .models import AcademicYear, Attachment, Blob, CloneJob, Element, Pointer, Request, Standard, UploadSession
+from .progress import recount_progress
+
+User = get_user_model()
+
+
+def create_academic_year(start_year, size):
+    """Create an academic year with `size` standards, pointers per standard, elements per pointer, attachments per element and courses."""
+    academic_year = AcademicYear.objects.create(
+        status=AcademicYear.Status.ACTIVE,
+        start_date=datetime.date(start_year, 9, 1),
+        end_date=datetime.date(start_year + 1, 6, 30),
+    )
+    for i in range(size):
+        standard = Standard.objects.create(academic_year=academic_year, title=f"Standard {i}", type=Standard.Type.ACADEMIC)
+        for j in range(size):
+            pointer = Pointer.objects.create(standard=standard, title=f"Pointer {i}.{j}")
+            for k in range(size):
+                element = Element.objects.create(pointer=pointer, title=f"Element {i}.{j}.{k}")
+                Attachment.objects.bulk_create(
+                    Attachment(element=element, standard=standard, academic_year=academic_year, title=f"Attachment {n}") for n in range(size)
+                )
+        course = Course.objects.create(
+            academic_year=academic_year,
+            title=f"Course {i}",
+            code=f"C{i}",
+            level=Course.Level.FIRST,
+            semester=Course.Semester.FIRST,
+            credit_hours=Course.CreditHours.TWO,
+        )
+        CourseFile.objects.bulk_create(CourseFile(course=course, title=f"File {n}") for n in range(size))
+    # The bulk created attachments did not go through the progress signals
+    recount_progress([academic_year])
+    return academic_year
+
+
+class TemporaryMediaMixin:
+    """Store the files of each test in a temporary MEDIA_ROOT."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media_settings = override_settings(MEDIA_ROOT=self.media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def blob_files(self):
+        """The blob files on disk, relative to MEDIA_ROOT."""
+        blob_dir = os.path.join(self.media_root, "blobs")
+        return sorted(
+            os.path.relpath(os.path.join(path, name), self.media_root)
+            for path, directories, names in os.walk(blob_dir)
+            for name in names
+            if not name.startswith(".")
+        )
+
+
+class StructureQueriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="admin@example.com", username="admin", password="password", role=User.Role.ADMIN, is_staff=True)
+        cls.small_year = create_academic_year(2023, 2)
+        cls.large_year = create_academic_year(2024, 5)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_structure_queries_do_not_grow_with_the_year(self):
+        """Building the structure takes the same number of queries for a small and a much larger year."""
+        small_count = Attachment.objects.filter(academic_year=self.small_year).count()
+        self.assertGreater(Attachment.objects.filter(academic_year=self.large_year).count(), 10 * small_count)
+        for academic_year in [self.small_year, self.large_year]:
+            with self.subTest(academic_year=str(academic_year)), self.assertNumQueries(12):
+                response = self.client.get(f"/api/academic-years/{academic_year.pk}/structure/?stream=0")
+            self.assertEqual(response.status_code, 200)
+
+    def test_structure_snapshot_is_served_in_fewer_queries(self):
+        """Once built, the structure is served from its snapshot."""
+        url = f"/api/academic-years/{self.large_year.pk}/structure/?stream=0"
+        first = self.client.get(url)
+        with self.assertNumQueries(2):
+            second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+
+
+class BlobReferenceTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="admin@example.com", username="admin", password="password", role=User.Role.ADMIN, is_staff=True)
+        cls.academic_year = create_academic_year(2024, 2)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.first, self.second = Attachment.objects.order_by("created_at")[:2]
+
+    def upload(self, attachment, content=b"same content"):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/attachments/{attachment.pk}/upload/", {"file": SimpleUploadedFile("file.pdf", content)})
+        self.assertEqual(response.status_code, 201)
+
+    def remove(self, attachment):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f"/api/attachments/{attachment.pk}/remove/")
+        self.assertEqual(response.status_code, 204)
+
+    def test_identical_uploads_share_a_blob(self):
+        """The blob of identical files is counted once per reference and removed with the last one."""
+        self.upload(self.first)
+        self.upload(self.second)
+        self.assertEqual(list(Blob.objects.values_list("ref_count", flat=True)), [2])
+        self.assertEqual(len(self.blob_files()), 1)
+
+        self.remove(self.first)
+        self.assertEqual(list(Blob.objects.values_list("ref_count", flat=True)), [1])
+        self.assertEqual(len(self.blob_files()), 1)
+
+        # Removing an attachment without a file again releases nothing
+        self.remove(self.first)
+        self.assertEqual(list(Blob.objects.values_list("ref_count", flat=True)), [1])
+
+        self.remove(self.second)
+        self.assertFalse(Blob.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, "blobs")), [])
+
+    def test_replaced_file_is_released(self):
+        """Replacing the file of an attachment releases the old blob."""
+        self.upload(self.first, b"old content")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f"/api/attachments/{self.first.pk}/", {"file": SimpleUploadedFile("new.pdf", b"new content")}, format="multipart"
+            )
+        self.assertEqual(response.status_code, 200)
+
+        self.first.refresh_from_db()
+        self.assertEqual(list(Blob.objects.values_list("digest", "ref_count")), [(self.first.sha256, 1)])
+        self.assertEqual(self.blob_files(), [os.path.dirname(self.first.file.name)])
+
+    def test_purge_releases_files(self):
+        """Purging a deleted academic year releases the blobs of its attachments."""
+        self.upload(self.first)
+        self.upload(self.second, b"other content")
+        mark_for_deletion(self.academic_year)
+        with self.captureOnCommitCallbacks(execute=True):
+            purge_pending_deletions(batch_size=3)
+
+        self.assertFalse(Attachment.objects.exists())
+        self.assertFalse(Blob.objects.exists())
+        self.assertEqual(self.blob_files(), [])
+
+
+class ProgressCountersTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="admin@example.com", username="admin", password="password", role=User.Role.ADMIN, is_staff=True)
+        cls.academic_year = create_academic_year(2024, 2)
+        cls.other_academic_year = create_academic_year(2025, 2)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def counters(self):
+        return {
+            model.__name__: sorted(model.objects.values_list("pk", "n_of_attachments", "n_of_attachments_uploaded"))
+            for model in [AcademicYear, Standard, Pointer, Element]
+        }
+
+    def assertCountersMatchRecount(self):
+        stored = self.counters()
+        recount_progress()
+        self.assertEqual(stored, self.counters())
+
+    def test_counters_match_recount(self):
+        """The counters kept up to date by each write equal a full recount."""
+        self.assertCountersMatchRecount()
+        attachments = list(Attachment.objects.filter(academic_year=self.academic_year).order_by("created_at")[:3])
+        with self.captureOnCommitCallbacks(execute=True):
+            for attachment in attachments:
+                response = self.client.post(f"/api/attachments/{attachment.pk}/upload/", {"file": SimpleUploadedFile("file.pdf", b"content")})
+                self.assertEqual(response.status_code, 201)
+            response = self.client.delete(f"/api/attachments/{attachments[0].pk}/remove/")
+            self.assertEqual(response.status_code, 204)
+        self.assertCountersMatchRecount()
+
+        # Move an element with an uploaded file to a pointer of the other academic year
+        pointer = Pointer.objects.filter(standard__academic_year=self.other_academic_year).first()
+        response = self.client.patch(f"/api/elements/{attachments[1].element_id}/", {"pointer": pointer.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertCountersMatchRecount()
+
+        standard = Standard.objects.filter(academic_year=self.academic_year).first()
+        response = self.client.delete(f"/api/standards/{standard.pk}/")
+        self.assertEqual(response.status_code, 202)
+        self.assertCountersMatchRecount()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            purge_pending_deletions(batch_size=3)
+        self.assertCountersMatchRecount()
+
+
+class SignedDownloadTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(email="admin@example.com", username="admin", password="password", role=User.Role.ADMIN, is_staff=True)
+        cls.ta = User.objects.create_user(email="ta@example.com", username="ta", password="password", role=User.Role.TA)
+        create_academic_year(2024, 2)
+        cls.standard = Standard.objects.order_by("created_at").first()
+        cls.standard.assigned_to.add(cls.ta)
+        cls.attachment = Attachment.objects.filter(standard=cls.standard).order_by("created_at").first()
+        cls.other_attachment = Attachment.objects.exclude(standard=cls.standard).order_by("created_at").first()
+
+    def setUp(self):
+        super().setUp()
+        admin_client = APIClient()
+        admin_client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            for attachment, content in [(self.attachment, b"attachment"), (self.other_attachment, b"other attachment")]:
+                admin_client.post(f"/api/attachments/{attachment.pk}/upload/", {"file": SimpleUploadedFile("file.pdf", content)})
+        self.attachment.refresh_from_db()
+        self.other_attachment.refresh_from_db()
+        self.client = APIClient()
+        self.client.force_authenticate(self.ta)
+
+    def signed_urls(self, *attachments):
+        response = self.client.post("/api/attachments/signed-urls/", {"ids": [attachment.pk for attachment in attachments]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.data["urls"]
+
+    def download(self, url, **changes):
+        """Download anonymously from `url`, with the given query parameters changed."""
+        parts = urlsplit(url)
+        query = {**dict(parse_qsl(parts.query)), **changes}
+        return Client().get(parts.path, query)
+
+    def test_anonymous_download(self):
+        """A signed URL downloads without authentication, and only for attachments the user may download."""
+        urls = self.signed_urls(self.attachment, self.other_attachment)
+        self.assertEqual(list(urls), [str(self.attachment.pk)])
+
+        response = self.download(urls[str(self.attachment.pk)])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"attachment")
+
+    def test_tampered_url(self):
+        url = self.signed_urls(self.attachment)[str(self.attachment.pk)]
+        query = dict(parse_qsl(urlsplit(url).query))
+        for changes in [
+            {"signature": "0" * len(query["signature"])},
+            {"signature": ""},
+            {"expires": str(int(query["expires"]) + 3600)},
+            {"user": str(self.admin.pk)},
+            # The id of another attachment with the signature and name of this one
+            {"id": str(self.other_attachment.pk)},
+            {"expires": "soon"},
+        ]:
+            with self.subTest(changes=changes):
+                self.assertEqual(self.download(url, **changes).status_code, 403)
+
+    def test_url_for_another_file(self):
+        """A signature is only valid for the file name it was issued for."""
+        url = self.signed_urls(self.attachment)[str(self.attachment.pk)]
+        other_path = reverse("signed-download", kwargs={"name": self.other_attachment.file.name})
+        self.assertEqual(Client().get(other_path, dict(parse_qsl(urlsplit(url).query))).status_code, 403)
+
+    def test_expired_url(self):
+        request = RequestFactory().get("/")
+        url = signed_download_url(request, self.attachment.file, self.attachment.pk, self.ta, expires=int(time.time()) - 1)
+        response = self.download(url)
+        self.assertEqual((response.status_code, response.content), (403, b"The download link has expired."))
+
+    def test_user_no_longer_allowed(self):
+        """
+        A user unassigned from the standard gets no new URLs. URLs already issued
+        are not checked against the database, so they stay valid until they expire.
+        """
+        url = self.signed_urls(self.attachment)[str(self.attachment.pk)]
+        self.standard.assigned_to.remove(self.ta)
+        self.assertEqual(self.signed_urls(self.attachment), {})
+
+        expires = int(dict(parse_qsl(urlsplit(url).query))["expires"])
+        self.assertLessEqual(expires, time.time() + settings.SIGNED_DOWNLOAD_MAX_AGE)
+        with mock.patch("QAU_API.downloads.time.time", return_value=expires + 1):
+            self.assertEqual(self.download(url).status_code, 403)
+
+
+class BundleDownloadTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(email="admin@example.com", username="admin", password="password", role=User.Role.ADMIN, is_staff=True)
+        cls.ta = User.objects.create_user(email="ta@example.com", username="ta", password="password", role=User.Role.TA)
+        create_academic_year(2024, 2)
+        cls.standard, cls.other_standard = Standard.objects.order_by("created_at")
+        cls.standard.assigned_to.add(cls.ta)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        attachments = [*Attachment.objects.filter(standard=self.standard).order_by("created_at")[:3], self.other_attachment()]
+        with self.captureOnCommitCallbacks(execute=True):
+            for attachment in attachments:
+                self.client.post(f"/api/attachments/{attachment.pk}/upload/", {"file": SimpleUploadedFile("file.pdf", attachment.title.encode())})
+
+    def other_attachment(self):
+        return Attachment.objects.filter(standard=self.other_standard).order_by("created_at").first()
+
+    def download(self, url):
+        """The entries of the downloaded archive with their content."""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        with zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content))) as archive:
+            return {name: archive.read(name) for name in archive.namelist()}
+
+    def test_standard_bundle(self):
+        self.client.force_authenticate(self.ta)
+        self.assertEqual(
+            self.download(f"/api/standards/{self.standard.pk}/download/"),
+            {
+                "Pointer 0.0/Element 0.0.0/Attachment 0.pdf": b"Attachment 0",
+                "Pointer 0.0/Element 0.0.0/Attachment 1.pdf": b"Attachment 1",
+                "Pointer 0.0/Element 0.0.1/Attachment 0.pdf": b"Attachment 0",
+            },
+        )
+        pointer = Pointer.objects.get(standard=self.standard, title="Pointer 0.0")
+        self.assertEqual(
+            list(self.download(f"/api/pointers/{pointer.pk}/download/")),
+            ["Element 0.0.0/Attachment 0.pdf", "Element 0.0.0/Attachment 1.pdf", "Element 0.0.1/Attachment 0.pdf"],
+        )
+        element = Element.objects.get(pointer=pointer, title="Element 0.0.0")
+        self.assertEqual(list(self.download(f"/api/elements/{element.pk}/download/")), ["Attachment 0.pdf", "Attachment 1.pdf"])
+
+    def test_bundle_only_has_files_the_user_may_download(self):
+        """A user sees only the files of the standards they are assigned to and the attachments shared with them."""
+        url = f"/api/standards/{self.other_standard.pk}/download/"
+        self.assertEqual(list(self.download(url)), ["Pointer 1.0/Element 1.0.0/Attachment 0.pdf"])
+
+        self.client.force_authenticate(self.ta)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+        self.other_attachment().shared_with.add(self.ta)
+        self.assertEqual(list(self.download(url)), ["Pointer 1.0/Element 1.0.0/Attachment 0.pdf"])
+
+    def test_bundle_without_files(self):
+        element = Element.objects.filter(standard=self.standard).order_by("-created_at").first()
+        self.assertEqual(self.client.get(f"/api/elements/{element.pk}/download/").status_code, 404)
+
+
+class UploadSessionTests(TemporaryMediaMixin, TestCase):
+    content = b"0123456789" * 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="admin@example.com", username="admin", password="password", role=User.Role.ADMIN, is_staff=True)
+        create_academic_year(2024, 1)
+        cls.attachment = Attachment.objects.select_related("element").first()
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def start(self, sha256=None):
+        response = self.client.post(
+            "/api/uploads/",
+            {
+                "attachment": self.attachment.pk,
+                "file_name": "file.pdf",
+                "size": len(self.content),
+                "sha256": sha256 or hashlib.sha256(self.content).hexdigest(),
+            },
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data["id"]
+
+    def send(self, upload_id, offset, data):
+        return self.client.put(f"/api/uploads/{upload_id}/chunk/", data, content_type="application/octet-stream", HTTP_UPLOAD_OFFSET=str(offset))
+
+    def finalize(self, upload_id):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f"/api/uploads/{upload_id}/finalize/")
+
+    def test_resumed_upload(self):
+        """An upload resumes from the stored offset and its file is stored on finalize."""
+        upload_id = self.start()
+        response = self.send(upload_id, 0, self.content[:40])
+        self.assertEqual((response.status_code, response["Upload-Offset"]), (200, "40"))
+
+        # After a disconnect the client asks where to resume from
+        self.assertEqual(self.client.get(f"/api/uploads/{upload_id}/").data["offset"], 40)
+        response = self.send(upload_id, 0, self.content)
+        self.assertEqual((response.status_code, response.data["offset"]), (409, 40))
+        response = self.send(upload_id, 40, self.content[40:])
+        self.assertEqual((response.status_code, response["Upload-Offset"]), (200, "100"))
+
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 201)
+        self.attachment.refresh_from_db()
+        with self.attachment.file.open("rb") as file:
+            self.assertEqual(file.read(), self.content)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_incomplete_upload_is_not_finalized(self):
+        """An incomplete upload cannot be finalized, and chunks past the announced size are refused."""
+        upload_id = self.start()
+        self.send(upload_id, 0, self.content[:40])
+        self.assertEqual(self.finalize(upload_id).status_code, 400)
+        self.assertEqual(self.send(upload_id, 0, self.content + b"!").status_code, 409)
+        self.assertEqual(self.send(upload_id, 40, self.content).status_code, 400)
+
+    def test_checksum_mismatch_is_rejected(self):
+        """An upload whose bytes do not match the checksum is discarded."""
+        upload_id = self.start(sha256="0" * 64)
+        self.send(upload_id, 0, self.content)
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 400)
+
+        self.attachment.refresh_from_db()
+        self.assertFalse(self.attachment.file)
+        self.assertEqual(UploadSession.objects.get(pk=upload_id).offset, 0)
+
+    def test_claimed_upload_refuses_chunks(self):
+        """A chunk sent while another one is being written is refused, an abandoned claim is taken over."""
+        upload_id = self.start()
+        UploadSession.objects.filter(pk=upload_id).update(claimed_at=timezone.now())
+        response = self.send(upload_id, 0, self.content)
+        self.assertEqual(response.status_code, 409)
+        self.assertNotIn("offset", response.data)
+        self.assertEqual(self.finalize(upload_id).status_code, 400)
+
+        abandoned_at = timezone.now() - datetime.timedelta(seconds=settings.UPLOAD_CHUNK_TIMEOUT + 1)
+        UploadSession.objects.filter(pk=upload_id).update(claimed_at=abandoned_at)
+        response = self.send(upload_id, 0, self.content)
+        self.assertEqual((response.status_code, response["Upload-Offset"]), (200, "100"))
+
+    def test_finalize_updates_progress(self):
+        """The counters of the element and its ancestors count the finalized file."""
+        element = self.attachment.element
+        counters = [
+            Element.objects.filter(pk=element.pk),
+            Pointer.objects.filter(pk=element.pointer_id),
+            Standard.objects.filter(pointers=element.pointer_id),
+            AcademicYear.objects.filter(pk=element.academic_year_id),
+        ]
+        before = [queryset.values_list("n_of_attachments_uploaded", flat=True).get() for queryset in counters]
+
+        upload_id = self.start()
+        self.send(upload_id, 0, self.content)
+        self.assertEqual(self.finalize(upload_id).status_code, 201)
+
+        after = [queryset.values_list("n_of_attachments_uploaded", flat=True).get() for queryset in counters]
+        self.assertEqual(after, [count + 1 for count in before])
+
+
+class AncestryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.academic_year = create_academic_year(2024, 2)
+        cls.other_academic_year = create_academic_year(2025, 2)
+
+    def assertAncestryInSync(self):
+        """The copied standard and academic year ids of every element and attachment match their parents."""
+        elements = Element.objects.exclude(standard_id=F("pointer__standard_id"), academic_year_id=F("pointer__standard__academic_year_id"))
+        attachments = Attachment.objects.exclude(
+            standard_id=F("element__pointer__standard_id"), academic_year_id=F("element__pointer__standard__academic_year_id")
+        )
+        self.assertEqual((list(elements), list(attachments)), ([], []))
+
+    def other_year(self, model):
+        return model.objects.filter(academic_year=self.other_academic_year).order_by("created_at").first()
+
+    def test_created_rows_copy_their_ancestry(self):
+        pointer = Pointer.objects.filter(standard__academic_year=self.academic_year).first()
+        element = Element.objects.create(pointer=pointer, title="New element")
+        attachment = Attachment.objects.create(element=element, title="New attachment")
+        self.assertEqual((element.standard_id, element.academic_year_id), (pointer.standard_id, self.academic_year.pk))
+        self.assertEqual((attachment.standard_id, attachment.academic_year_id), (pointer.standard_id, self.academic_year.pk))
+        self.assertAncestryInSync()
+
+    def test_moves_update_the_descendants(self):
+        """Moving a row to a parent in another academic year updates the copies of all the rows below it."""
+        attachment = Attachment.objects.filter(academic_year=self.academic_year).first()
+        attachment.element = self.other_year(Element)
+        attachment.save()
+        self.assertAncestryInSync()
+
+        element = Element.objects.filter(academic_year=self.academic_year).first()
+        element.pointer = Pointer.objects.filter(standard__academic_year=self.other_academic_year).first()
+        element.save()
+        self.assertAncestryInSync()
+
+        pointer = Pointer.objects.filter(standard__academic_year=self.academic_year).first()
+        pointer.standard = self.other_year(Standard)
+        pointer.save()
+        self.assertAncestryInSync()
+
+        standard = Standard.objects.filter(academic_year=self.academic_year).first()
+        standard.academic_year = self.other_academic_year
+        standard.save()
+        self.assertAncestryInSync()
+        self.assertEqual(set(Attachment.objects.filter(standard=standard).values_list("academic_year", flat=True)), {self.other_academic_year.pk})
+
+
+class CloneAcademicYearTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.source_year = create_academic_year(2024, 2)
+        # One uploaded attachment and one standard being deleted, neither is copied
+        Attachment.objects.filter(pk=Attachment.objects.order_by("created_at").values("pk")[:1]).update(file="blobs/00/file.pdf", has_file=True)
+        mark_for_deletion(Standard.objects.filter(academic_year=cls.source_year).order_by("-created_at").first())
+        recount_progress([cls.source_year])
+
+    def test_clone_copies_every_row(self):
+        """The copied counts match the source rows and the counters of the new year match a recount."""
+        expected = count_academic_year(self.source_year)
+        target_year = AcademicYear.objects.create(
+            status=AcademicYear.Status.ACTIVE, start_date=datetime.date(2025, 9, 1), end_date=datetime.date(2026, 6, 30)
+        )
+        done = {}
+        copied_count = clone_academic_year(self.source_year, target_year, batch_size=3, progress=lambda level, n: done.update({level: n}))
+
+        self.assertEqual(copied_count, expected)
+        self.assertEqual(done, expected)
+        self.assertEqual(count_academic_year(target_year), expected)
+        self.assertFalse(Attachment.objects.filter(academic_year=target_year, has_file=True).exists())
+        self.assertEqual(
+            set(Element.objects.filter(academic_year=target_year).values_list("standard__academic_year", flat=True)), {target_year.pk}
+        )
+
+        counters = [
+            model.objects.values_list("pk", "n_of_attachments", "n_of_attachments_uploaded").order_by("pk")
+            for model in [AcademicYear, Standard, Pointer, Element]
+        ]
+        stored = [list(queryset) for queryset in counters]
+        recount_progress([target_year])
+        self.assertEqual(stored, [list(queryset) for queryset in counters])
+        target_year.refresh_from_db()
+        self.assertEqual((target_year.n_of_attachments, target_year.n_of_attachments_uploaded), (expected["attachments"], 0))
+
+
+class BenchmarkUuidKeysTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_academic_year(2024, 2)
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "The index sizes are read from PostgreSQL")
+    def test_benchmark_keeps_nothing(self):
+        counts = [model.objects.count() for model in [Standard, Pointer, Element, Attachment]]
+        stdout = io.StringIO()
+        call_command("benchmark_uuid_keys", "--rounds", "2", stdout=stdout)
+
+        output = stdout.getvalue()
+        for name in ["uuid4", "uuid7"]:
+            self.assertIn(f"{name} Attachments: 32 rows", output)
+            self.assertIn(f"{name} total: 60 rows", output)
+        self.assertIn("uuid7 vs uuid4:", output)
+        self.assertEqual([model.objects.count() for model in [Standard, Pointer, Element, Attachment]], counts)
+
+    @unittest.skipIf(connection.vendor == "postgresql", "The benchmark runs on PostgreSQL")
+    def test_benchmark_requires_postgresql(self):
+        with self.assertRaisesMessage(CommandError, "PostgreSQL"):
+            call_command("benchmark_uuid_keys", stdout=io.StringIO())
+
+
+class CloneJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.source_year = create_academic_year(2024, 2)
+
+    def run_jobs(self):
+        call_command("run_year_jobs", "--once", stdout=io.StringIO())
+
+    def create_job(self):
+        return CloneJob.objects.create(
+            source_academic_year=self.source_year,
+            academic_year_data={"status": AcademicYear.Status.ACTIVE, "start_date": "2025-09-01", "end_date": "2026-06-30"},
+        )
+
+    def test_job_creates_the_year(self):
+        job = self.create_job()
+        self.run_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, CloneJob.Status.SUCCEEDED)
+        self.assertEqual(job.copied_count, count_academic_year(self.source_year))
+        self.assertEqual(count_academic_year(job.academic_year), job.copied_count)
+
+    def test_failing_job_rolls_back_the_year(self):
+        """A job failing halfway leaves neither the new year nor any copied row."""
+        job = self.create_job()
+        with mock.patch("standards.cloning.copy_courses", side_effect=RuntimeError("Copy failed.")):
+            self.run_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error, job.copied_count, job.academic_year), (CloneJob.Status.FAILED, "Copy failed.", None, None))
+        self.assertEqual(list(AcademicYear.objects.all()), [self.source_year])
+        self.assertFalse(Standard.objects.exclude(academic_year=self.source_year).exists())
+
+    def test_stale_running_job_fails(self):
+        """A running job without a heartbeat for CLONE_JOB_TIMEOUT is failed, a recent one is left alone."""
+        stale_job, running_job = self.create_job(), self.create_job()
+        CloneJob.objects.update(status=CloneJob.Status.RUNNING)
+        stale_at = timezone.now() - datetime.timedelta(seconds=settings.CLONE_JOB_TIMEOUT + 1)
+        CloneJob.objects.filter(pk=stale_job.pk).update(updated_at=stale_at)
+        self.run_jobs()
+
+        stale_job.refresh_from_db()
+        running_job.refresh_from_db()
+        self.assertEqual((stale_job.status, stale_job.error), (CloneJob.Status.FAILED, "The worker running the job stopped."))
+        self.assertEqual(running_job.status, CloneJob.Status.RUNNING)
+
+    def test_source_pending_deletion_fails_the_job(self):
+        """A job queued for a year that was then deleted does not copy it."""
+        job = self.create_job()
+        mark_for_deletion(self.source_year)
+        self.run_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, CloneJob.Status.FAILED)
+        self.assertEqual(job.error, "The source academic year is being deleted.")
+        self.assertFalse(AcademicYear.objects.filter(start_date=datetime.date(2025, 9, 1)).exists())
+
+
+def create_list_rows(n_parents, n_children):
+    """
+    Bulk create n_parents academic years, then at each level (standards, pointers, elements and attachments;
+    courses, course files and course attachments) n_children rows for each of the first n_parents rows of the
+    level above, so every list table has n_parents * n_children rows. Each attachment gets a request between
+    two of n_parents * n_children users.
+    """
+    users = User.objects.bulk_create(
+        User(email=f"user{n}@example.com", username=f"user{n}", role=User.Role.TA) for n in range(n_parents * n_children)
+    )
+    years = AcademicYear.objects.bulk_create(
+        AcademicYear(status=AcademicYear.Status.ACTIVE, start_date=datetime.date(1000 + n, 9, 1), end_date=datetime.date(1001 + n, 6, 30))
+        for n in range(n_parents)
+    )
+
+    def children(parents, make):
+        return [make(parent, n) for parent in parents[:n_parents] for n in range(n_children)]
+
+    standards = Standard.objects.bulk_create(
+        children(years, lambda year, n: Standard(academic_year=year, title=f"Standard {n}", type=Standard.Type.values[n % 2]))
+    )
+    pointers = Pointer.objects.bulk_create(children(standards, lambda standard, n: Pointer(standard=standard, title=f"Pointer {n}")))
+    elements = Element.objects.bulk_create(
+        children(
+            pointers,
+            lambda pointer, n: Element(
+                pointer=pointer, standard=pointer.standard, academic_year=pointer.standard.academic_year, title=f"Element {n}"
+            ),
+        )
+    )
+    attachments = Attachment.objects.bulk_create(
+        children(
+            elements,
+            lambda element, n: Attachment(element=element, standard=element.standard, academic_year=element.academic_year, title=f"Attachment {n}"),
+        )
+    )
+    Request.objects.bulk_create(
+        Request(requester=users[n // n_children], receiver=users[-1 - n // n_children], made_on=attachment)
+        for n, attachment in enumerate(attachments)
+    )
+    courses = Course.objects.bulk_create(
+        children(
+            years,
+            lambda year, n: Course(
+                academic_year=year,
+                title=f"Course {n}",
+                code=f"C{n}",
+                level=Course.Level.FIRST,
+                semester=Course.Semester.FIRST,
+                credit_hours=Course.CreditHours.TWO,
+            ),
+        )
+    )
+    course_files = CourseFile.objects.bulk_create(children(courses, lambda course, n: CourseFile(course=course, title=f"File {n}")))
+    CourseAttachment.objects.bulk_create(
+        children(course_files, lambda course_file, n: CourseAttachment(course_file=course_file, file=f"course_files/{course_file.pk}-{n}.pdf"))
+    )
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "Query plans are only checked on PostgreSQL")
+class ListQueryPlanTests(TestCase):
+    """
+    The list endpoints (unfiltered or filtered on one filterset field) and the index
+    their page query should be served by.
+    """
+
+    intended_indexes = {
+        ("standards", "academic_year"): "standard_year_created_idx",
+        ("pointers", "standard"): "pointer_standard_created_idx",
+        ("elements", "pointer"): "element_pointer_created_idx",
+        ("attachments", None): "attachment_created_idx",
+        ("attachments", "element"): "attachment_element_created_idx",
+        ("requests", None): "request_created_idx",
+        ("requests", "requester"): "request_requester_status_idx",
+        ("requests", "receiver"): "request_receiver_status_idx",
+        ("courses", "academic_year"): "course_year_created_idx",
+        ("course-files", "course"): "coursefile_course_created_idx",
+        ("course-attachments", "course_file"): "courseatt_file_created_idx",
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="admin@example.com", username="admin", password="password", role=User.Role.ADMIN, is_staff=True)
+        # Enough rows for the planner to prefer the indexes on its own
+        create_list_rows(n_parents=500, n_children=10)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        self.command = ExplainListQueriesCommand()
+
+    def test_list_queries_use_their_index(self):
+        """The planner picks the intended index for the page query of each list endpoint."""
+        viewsets = {prefix: viewset for prefix, viewset, basename in router.registry}
+        for (prefix, field), index_name in self.intended_indexes.items():
+            viewset = viewsets[prefix]
+            params = next(params for params in self.command._list_params(viewset) if next(iter(params), None) == field)
+            with self.subTest(endpoint=f"/api/{prefix}/", params=params):
+                sql = self.command._page_query(viewset, params, self.user)
+                self.assertIn(index_name, self.command._index_names(sql))
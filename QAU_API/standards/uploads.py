@@ -0,0 +1,155 @@
+import hashlib
+import os
+from datetime import timedelta
+
+from courses.models import CourseAttachment
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from QAU_API.downloads import CHUNK_SIZE
+
+from .access import AccessControl
+from .models import Attachment, UploadSession
+
+
+class OffsetMismatch(Exception):
+    """The chunk does not start where the upload session stopped."""
+
+    def __init__(self, offset):
+        super().__init__(f"The upload is at offset {offset}.")
+        self.offset = offset
+
+
+class UploadTooLarge(Exception):
+    """The chunk goes past the announced size of the file."""
+
+
+class ChunkInProgress(Exception):
+    """Another chunk of the upload session is being written."""
+
+
+class UploadForbidden(Exception):
+    """The user may no longer upload to the attachment or course file."""
+
+
+def _read_chunks(stream):
+    """Yield the chunks of a request body, stopping early if the client disconnects."""
+    try:
+        while stream is not None and (chunk := stream.read(CHUNK_SIZE)):
+            yield chunk
+    except OSError:
+        return
+
+
+def _claim_expiry():
+    """Claims made before this time are abandoned."""
+    return timezone.now() - timedelta(seconds=settings.UPLOAD_CHUNK_TIMEOUT)
+
+
+def _claim(session, offset):
+    """
+    Claim the part file of an upload session for a chunk starting at `offset`
+    and return the claim time.
+
+    The claim is a single conditional UPDATE, so no transaction or row lock is
+    held while the chunk is received. Claims older than UPLOAD_CHUNK_TIMEOUT
+    are taken over.
+    """
+    claimed_at = timezone.now()
+    sessions = UploadSession.objects.filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=_claim_expiry()), pk=session.pk, offset=offset)
+    if not sessions.update(claimed_at=claimed_at):
+        current_offset = UploadSession.objects.filter(pk=session.pk).values_list("offset", flat=True).get()
+        if current_offset != offset:
+            raise OffsetMismatch(current_offset)
+        raise ChunkInProgress("Another chunk of the upload is being written.")
+    return claimed_at
+
+
+def append_chunk(session, offset, stream):
+    """
+    Append the bytes of `stream` to the part file of an upload session,
+    starting at `offset`, and return the new offset.
+
+    The session is claimed before writing (see _claim) so concurrent chunks
+    are refused, and the new offset is stored when the claim is released.
+    Bytes received before a disconnect are kept, so the client can resume
+    from the stored offset.
+    """
+    os.makedirs(os.path.dirname(session.part_path), exist_ok=True)
+    claimed_at = _claim(session, offset)
+    new_offset = offset
+    try:
+        with open(session.part_path, "ab") as part:
+            # Drop bytes of an interrupted write that were never acknowledged
+            part.truncate(offset)
+            part.seek(offset)
+            for chunk in _read_chunks(stream):
+                if part.tell() + len(chunk) > session.size:
+                    part.truncate(offset)
+                    raise UploadTooLarge(f"The file is larger than the announced {session.size} bytes.")
+                part.write(chunk)
+            new_offset = part.tell()
+    finally:
+        UploadSession.objects.filter(pk=session.pk, claimed_at=claimed_at).update(
+            offset=new_offset, claimed_at=None, updated_at=timezone.now()
+        )
+    return new_offset
+
+
+def _file_digest(path):
+    """Compute the SHA-256 digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def finalize_upload(session, user):
+    """
+    Verify the checksum of a complete upload and store the file in the
+    attachment (or in a new course attachment of the course file).
+
+    Returns the updated Attachment or the new CourseAttachment. Raises
+    UploadForbidden if the user may no longer upload there (assignments can
+    change during an upload), and ValueError if the upload is incomplete or
+    the checksum does not match, in which case the received bytes are discarded.
+    """
+    access = AccessControl(user)
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update(of=("self",)).select_related("course_file__course").get(pk=session.pk)
+        if session.claimed_at and session.claimed_at >= _claim_expiry():
+            raise ValueError("A chunk of the upload is being written.")
+        if session.offset != session.size:
+            raise ValueError(f"The upload is incomplete ({session.offset} of {session.size} bytes).")
+        if session.attachment_id:
+            # Locked like the other attachment writes, so the progress counters see its committed file
+            session.attachment = Attachment.objects.select_for_update().get(pk=session.attachment_id)
+            if not access.can_modify_attachment(session.attachment):
+                raise UploadForbidden("You are not assigned to this standard.")
+        elif not access.can_modify_course_file(session.course_file):
+            raise UploadForbidden("You are not the professor of this course.")
+        if session.attachment_id and session.attachment.file:
+            raise ValueError("Attachment already has a file.")
+        if _file_digest(session.part_path) != session.sha256:
+            # Start over, the received bytes cannot be trusted
+            os.unlink(session.part_path)
+            UploadSession.objects.filter(pk=session.pk).update(offset=0)
+            target = None
+        else:
+            if session.attachment_id:
+                target = session.attachment
+                target.uploaded_by = user
+            else:
+                target = CourseAttachment(course_file=session.course_file)
+
+            # The part file is moved into the storage, its bytes are not copied again
+            storage = type(target)._meta.get_field("file").storage
+            target.file.name = storage.adopt(session.part_path, session.sha256, session.size, session.file_name)
+            target.save()
+            session.delete()
+
+    if target is None:
+        raise ValueError("The checksum of the uploaded file does not match.")
+    return target
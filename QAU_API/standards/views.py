@@ -2,18 +2,26 @@ import os
 
 # Import course models
 from courses.models import Course, CourseFile
-from courses.serializers import CourseSerializer
-from django.conf import settings
-from django.http import FileResponse, HttpResponse
-from django.shortcuts import get_object_or_404
+from courses.serializers import CourseAttachmentSerializer
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import status, viewsets
+from QAU_API.downloads import serve_file, serve_zip, signed_download_url
+from QAU_API.mixins import PendingDeletionMixin
+from QAU_API.pagination import EstimatedCountPagination
+from rest_framework import mixins, serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
-from .models import AcademicYear, Attachment, Element, Pointer, Request, Standard
+from .access import AccessControl
+from .bundles import attachment_entries
+from .cloning import clone_academic_year, count_academic_year
+from .deletion import mark_for_deletion
+from .models import AcademicYear, Attachment, CloneJob, Element, Pointer, Request, Standard, UploadSession
 from .permissions import (
     IsAssignedToStandard,
     IsReceiver,
@@ -23,15 +31,19 @@ from .permissions import (
 from .serializers import (
     AcademicYearSerializer,
     AttachmentSerializer,
+    CloneJobSerializer,
     ElementSerializer,
     PointerSerializer,
     RequestDetailSerializer,
     RequestSerializer,
     StandardSerializer,
+    UploadSessionSerializer,
 )
+from .structure import get_structure_snapshot, is_large_structure, iter_structure
+from .uploads import ChunkInProgress, OffsetMismatch, UploadForbidden, UploadTooLarge, append_chunk, finalize_upload
 
 
-class AcademicYearViewSet(viewsets.ModelViewSet):
+class AcademicYearViewSet(PendingDeletionMixin, viewsets.ModelViewSet):
     """
     ViewSet for AcademicYear model.
     Admin: Full CRUD operations
@@ -42,134 +54,120 @@ class AcademicYearViewSet(viewsets.ModelViewSet):
     - Sort by start_date
     - Search by start_date, end_date
     - Pagination
-    - Create new year based on latest year structure (Admin only)
+    - Create new year based on latest year structure (Admin only), optionally as a background job
     - View complete year structure (structure action)
+    - Deletion in the background (destroy returns 202 and hides the year at once)
     """
 
     queryset = AcademicYear.objects.all()
     serializer_class = AcademicYearSerializer
+    pending_deletion_lookups = ["pending_deletion"]
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ["status"]
     search_fields = ["start_date"]
     ordering_fields = ["start_date"]
     ordering = ["-start_date"]
+    cursor_ordering = ["-start_date", "-id"]
 
     def get_permissions(self):
-        if self.action in ["create", "update", "partial_update", "destroy", "repeat_schema", "create_new_year"]:
+        if self.action in ["create", "update", "partial_update", "destroy", "repeat_schema", "create_new_year", "jobs"]:
             return [IsAdminUser()]
         return [IsAuthenticated()]
 
+    def destroy(self, request, *args, **kwargs):
+        """
+        Mark the academic year for deletion. It is hidden at once and purged with
+        everything under it (and the stored files) by the run_year_jobs worker.
+        """
+        mark_for_deletion(self.get_object())
+        return Response({"detail": "The academic year is scheduled for deletion."}, status=status.HTTP_202_ACCEPTED)
+
     @action(detail=True, methods=["get"])
     def structure(self, request, pk=None):
         """
         Get the complete hierarchical structure of an academic year.
         This includes all standards, pointers, elements, and courses,
         but excludes user information and actual file content.
+        The whole tree is loaded with a fixed number of queries and kept
+        as a snapshot until any part of it changes.
+
+        Query parameters:
+        - stream: 1 to stream the JSON in batches instead of building it in memory,
+          0 to never stream. By default years above STRUCTURE_STREAM_THRESHOLD
+          attachments are streamed when no snapshot is available.
 
         Returns:
         - standards: List of standards with their pointers and elements
         - courses: List of courses with their course files
         """
         academic_year = self.get_object()
+        stream = request.query_params.get("stream")
 
-        # Get all standards for this year with related objects
-        standards_data = []
-        standards = Standard.objects.filter(academic_year=academic_year)
-
-        for standard in standards:
-            standard_data = {"id": standard.id, "title": standard.title, "type": standard.type, "pointers": []}
-
-            # Get pointers for this standard
-            pointers = Pointer.objects.filter(standard=standard)
-            for pointer in pointers:
-                pointer_data = {"id": pointer.id, "title": pointer.title, "elements": []}
-
-                # Get elements for this pointer
-                elements = Element.objects.filter(pointer=pointer)
-                for element in elements:
-                    element_data = {"id": element.id, "title": element.title, "attachments": []}
-
-                    # Get attachments for this element (excluding file content and user info)
-                    attachments = Attachment.objects.filter(element=element)
-                    for attachment in attachments:
-                        element_data["attachments"].append({"id": attachment.id, "title": attachment.title, "has_file": bool(attachment.file)})
-
-                    pointer_data["elements"].append(element_data)
-
-                standard_data["pointers"].append(pointer_data)
-
-            standards_data.append(standard_data)
-
-        # Get all courses for this year with related objects
-        courses_data = []
-        courses = Course.objects.filter(academic_year=academic_year)
-
-        for course in courses:
-            course_data = {
-                "id": course.id,
-                "title": course.title,
-                "code": course.code,
-                "level": course.level,
-                "semester": course.semester,
-                "credit_hours": course.credit_hours,
-                "department": course.department,
-                "course_files": [],
-            }
-
-            # Get course files for this course (excluding file content and user info)
-            course_files = CourseFile.objects.filter(course=course)
-            for course_file in course_files:
-                course_data["course_files"].append(
-                    {"id": course_file.id, "title": course_file.title, "has_file": bool(course_file.file) if hasattr(course_file, "file") else False}
-                )
-
-            courses_data.append(course_data)
-
-        # Combine the data
-        structure_data = {
-            "academic_year": {"id": academic_year.id, "start_date": academic_year.start_date, "end_date": academic_year.end_date, "status": academic_year.status},
-            "standards": standards_data,
-            "courses": courses_data,
-        }
+        if stream is None:
+            data = get_structure_snapshot(academic_year, build=False)
+            if data is not None:
+                return HttpResponse(data, content_type="application/json")
+            stream = is_large_structure(academic_year)
+        else:
+            stream = stream.lower() in ["1", "true"]
 
-        return Response(structure_data)
+        if stream:
+            return StreamingHttpResponse(iter_structure(academic_year), content_type="application/json")
+        return HttpResponse(get_structure_snapshot(academic_year), content_type="application/json")
 
     @action(detail=False, methods=["post"])
     def create_new_year(self, request):
         """
         Create a new academic year and automatically copy all structure (standards, pointers, elements)
         and courses (with course files) from the latest academic year.
-        Does not copy attachment files or permissions.
+        Does not copy attachment files or shares.
 
         Required POST data:
         - start_date: Start date of new academic year (YYYY-MM-DD)
         - end_date: End date of new academic year (YYYY-MM-DD)
         - status: Status of new academic year (ACTIVE or ARCHIVED)
+
+        Optional POST data:
+        - copy_assignments: true to also copy the users assigned to each standard
+        - async: true to run the copy as a background job (run_year_jobs worker).
+          Returns 202 with the job, which can be polled at jobs/{id}/
         """
         # Get the data for the new year
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         # Find the latest academic year to copy from
-        latest_year = AcademicYear.objects.order_by("-start_date").first()
+        latest_year = AcademicYear.objects.filter(pending_deletion=False).order_by("-start_date").first()
         if not latest_year:
             return Response(
                 {"detail": "No existing academic year found to copy from."},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # Create the new academic year
-        new_academic_year = serializer.save()
-
-        # Copy standards and their related objects
-        standards_copied = self._copy_standards(latest_year, new_academic_year)
-
-        # Copy courses and their related objects
-        courses_copied = self._copy_courses(latest_year, new_academic_year)
-
-        # Combine the copied counts
-        copied_count = {**standards_copied, **courses_copied}
+        copy_assignments = str(request.data.get("copy_assignments", "")).lower() in ["1", "true"]
+        run_async = str(request.data.get("async", request.query_params.get("async", ""))).lower() in ["1", "true"]
+
+        if run_async:
+            total_count = count_academic_year(latest_year)
+            job = CloneJob.objects.create(
+                source_academic_year=latest_year,
+                academic_year_data=serializer.data,
+                copy_assignments=copy_assignments,
+                progress={level: {"done": 0, "total": total} for level, total in total_count.items()},
+                created_by=request.user,
+            )
+            return Response(CloneJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+        # Create the new academic year and copy the structure in one transaction,
+        # so a failure does not leave a half-built year behind
+        with transaction.atomic():
+            # Locked so the source cannot be marked for deletion (and purged) while it is copied
+            latest_year = AcademicYear.objects.select_for_update().filter(pk=latest_year.pk, pending_deletion=False).first()
+            if latest_year is None:
+                return Response({"detail": "The academic year to copy from is being deleted."}, status=status.HTTP_409_CONFLICT)
+            new_academic_year = serializer.save()
+            copied_count = clone_academic_year(latest_year, new_academic_year, copy_assignments=copy_assignments)
 
         return Response(
             {
@@ -180,138 +178,74 @@ class AcademicYearViewSet(viewsets.ModelViewSet):
             status=status.HTTP_201_CREATED,
         )
 
+    @action(detail=False, methods=["get"], url_path=r"jobs/(?P<job_id>[^/.]+)")
+    def jobs(self, request, job_id=None):
+        """
+        Get the status of a background create_new_year job,
+        with per-level progress and the final copied_count.
+        """
+        job = get_object_or_404(CloneJob, pk=job_id)
+        return Response(CloneJobSerializer(job).data)
+
     @action(detail=True, methods=["get"])
     def statistics(self, request, pk=None):
         """
-        Get Number of standards and courses completed
+        Get Number of standards and courses completed,
+        with breakdowns by standard type and by course department.
+        Counts come from the standards' progress counters and one aggregated query for courses.
         """
 
         academic_year = self.get_object()
-        standards = Standard.objects.filter(academic_year=academic_year)
-        courses = Course.objects.filter(academic_year=academic_year)
-
-        standards_serializer = StandardSerializer(standards, many=True)
-        courses_serializer = CourseSerializer(courses, many=True)
-
-        # Get the number of standards and courses
-        n_of_standards = len(standards)
-        n_of_courses = len(courses)
-
-        n_of_completed_standards = 0
-        n_of_completed_courses = 0
-        for standard in standards_serializer.data:
-            n_of_attachments = standard.get("n_of_attachments")
-            n_of_attachments_uploaded = standard.get("n_of_attachments_uploaded")
-            if n_of_attachments == n_of_attachments_uploaded:
-                n_of_completed_standards += 1
-
-        for course in courses_serializer.data:
-            n_of_course_files = course.get("n_of_course_files")
-            n_of_course_files_uploaded = course.get("n_of_course_files_uploaded")
-            if n_of_course_files == n_of_course_files_uploaded:
-                n_of_completed_courses += 1
 
-        return Response(
-            {
-                "n_of_standards": n_of_standards,
-                "n_of_courses": n_of_courses,
-                "n_of_completed_standards": n_of_completed_standards,
-                "n_of_completed_courses": n_of_completed_courses,
-            },
-            status=status.HTTP_200_OK,
+        # A standard is completed when all its attachments have a file
+        standards = Standard.objects.filter(academic_year=academic_year, pending_deletion=False).values(
+            "type", "n_of_attachments", "n_of_attachments_uploaded"
+        )
+        # A course is completed when it has as many uploaded attachments as course files
+        courses = (
+            Course.objects.filter(academic_year=academic_year)
+            .with_progress()
+            .values("department", "n_of_course_files", "n_of_course_files_uploaded")
         )
 
-    def _copy_standards(self, source_academic_year, target_academic_year):
-        """Helper method to copy standards and related objects from source to target academic year."""
-        copied_count = {
-            "standards": 0,
-            "pointers": 0,
-            "elements": 0,
-            "attachments": 0,
+        by_type = {
+            standard_type: {"n_of_standards": 0, "n_of_completed_standards": 0, "n_of_attachments": 0, "n_of_attachments_uploaded": 0}
+            for standard_type in Standard.Type.values
         }
-
-        # Get all standards from source
-        source_standards = Standard.objects.filter(academic_year=source_academic_year)
-
-        for source_standard in source_standards:
-            # Create new standard in target academic year
-            new_standard = Standard.objects.create(
-                academic_year=target_academic_year,
-                title=source_standard.title,
-                type=source_standard.type,
-            )
-            copied_count["standards"] += 1
-
-            # Copy pointers
-            source_pointers = Pointer.objects.filter(standard=source_standard)
-            for source_pointer in source_pointers:
-                new_pointer = Pointer.objects.create(
-                    standard=new_standard,
-                    title=source_pointer.title,
-                )
-                copied_count["pointers"] += 1
-
-                # Copy elements
-                source_elements = Element.objects.filter(pointer=source_pointer)
-                for source_element in source_elements:
-                    new_element = Element.objects.create(
-                        pointer=new_pointer,
-                        title=source_element.title,
-                    )
-                    copied_count["elements"] += 1
-
-                    # Create empty attachment placeholders (no files or permissions)
-                    source_attachments = Attachment.objects.filter(element=source_element)
-                    for source_attachment in source_attachments:
-                        Attachment.objects.create(
-                            element=new_element,
-                            title=source_attachment.title,
-                        )
-                        copied_count["attachments"] += 1
-
-        return copied_count
-
-    def _copy_courses(self, source_academic_year, target_academic_year):
-        """Helper method to copy courses and course files from source to target academic year."""
-        copied_count = {
-            "courses": 0,
-            "course_files": 0,
+        for standard in standards:
+            totals = by_type[standard["type"]]
+            totals["n_of_standards"] += 1
+            totals["n_of_attachments"] += standard["n_of_attachments"]
+            totals["n_of_attachments_uploaded"] += standard["n_of_attachments_uploaded"]
+            if standard["n_of_attachments"] == standard["n_of_attachments_uploaded"]:
+                totals["n_of_completed_standards"] += 1
+
+        by_department = {
+            department: {"n_of_courses": 0, "n_of_completed_courses": 0, "n_of_course_files": 0, "n_of_course_files_uploaded": 0}
+            for department in Course.Department.values + ["UNASSIGNED"]
         }
+        for course in courses:
+            totals = by_department[course["department"] or "UNASSIGNED"]
+            totals["n_of_courses"] += 1
+            totals["n_of_course_files"] += course["n_of_course_files"]
+            totals["n_of_course_files_uploaded"] += course["n_of_course_files_uploaded"]
+            if course["n_of_course_files"] == course["n_of_course_files_uploaded"]:
+                totals["n_of_completed_courses"] += 1
 
-        # Get all courses from source
-        source_courses = Course.objects.filter(academic_year=source_academic_year)
-
-        for source_course in source_courses:
-            # Create new course in target academic year with same attributes except ID, academic_year
-            # Note: We keep the same professor assignment
-            new_course = Course.objects.create(
-                academic_year=target_academic_year,
-                professor=source_course.professor,
-                title=source_course.title,
-                code=f"{source_course.code}_{target_academic_year.start_date.year}",  # Make code unique for new year
-                level=source_course.level,
-                semester=source_course.semester,
-                credit_hours=source_course.credit_hours,
-                department=source_course.department,
-            )
-            copied_count["courses"] += 1
-
-            # Copy course files
-            source_course_files = CourseFile.objects.filter(course=source_course)
-            for source_file in source_course_files:
-                # Create empty course file (no attachments)
-                new_file = CourseFile.objects.create(
-                    course=new_course,
-                    title=source_file.title,
-                )
-                copied_count["course_files"] += 1
-
-                # Note: We do not copy CourseAttachments as they contain actual files
-
-        return copied_count
+        return Response(
+            {
+                "n_of_standards": sum(totals["n_of_standards"] for totals in by_type.values()),
+                "n_of_courses": sum(totals["n_of_courses"] for totals in by_department.values()),
+                "n_of_completed_standards": sum(totals["n_of_completed_standards"] for totals in by_type.values()),
+                "n_of_completed_courses": sum(totals["n_of_completed_courses"] for totals in by_department.values()),
+                "by_type": by_type,
+                "by_department": by_department,
+            },
+            status=status.HTTP_200_OK,
+        )
 
 
-class StandardViewSet(viewsets.ModelViewSet):
+class StandardViewSet(PendingDeletionMixin, viewsets.ModelViewSet):
     """
     ViewSet for Standard model.
     Admin: Full CRUD operations
@@ -322,10 +256,12 @@ class StandardViewSet(viewsets.ModelViewSet):
     - Sort by created_at
     - Search by title
     - Pagination
+    - Deletion in the background (destroy returns 202 and hides the standard at once)
     """
 
-    queryset = Standard.objects.all()
+    queryset = Standard.objects.prefetch_related("assigned_to")
     serializer_class = StandardSerializer
+    pending_deletion_lookups = ["pending_deletion", "academic_year__pending_deletion"]
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ["type", "academic_year"]
@@ -338,8 +274,31 @@ class StandardViewSet(viewsets.ModelViewSet):
             return [IsAdminUser()]
         return [IsAuthenticated()]
 
+    def destroy(self, request, *args, **kwargs):
+        """
+        Mark the standard for deletion. It is hidden at once and purged with its
+        pointers, elements and attachments (and the stored files) by the run_year_jobs worker.
+        """
+        mark_for_deletion(self.get_object())
+        return Response({"detail": "The standard is scheduled for deletion."}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        """
+        Download the uploaded files of the standard as a ZIP archive,
+        with one folder per pointer and element.
+        Only files the user may download (staff, assigned or shared) are included,
+        404 if there are none.
+        """
+        standard = self.get_object()
+        entries = attachment_entries(Q(standard=standard), AccessControl.for_request(request), 1)
+        response = serve_zip(entries, f"{standard.title}.zip")
+        if response:
+            return response
+        return Response({"detail": "No files to download."}, status=status.HTTP_404_NOT_FOUND)
+
 
-class PointerViewSet(viewsets.ModelViewSet):
+class PointerViewSet(PendingDeletionMixin, viewsets.ModelViewSet):
     """
     ViewSet for Pointer model.
     Admin: Full CRUD operations
@@ -354,6 +313,7 @@ class PointerViewSet(viewsets.ModelViewSet):
 
     queryset = Pointer.objects.all()
     serializer_class = PointerSerializer
+    pending_deletion_lookups = ["standard__pending_deletion", "standard__academic_year__pending_deletion"]
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ["standard"]
@@ -366,8 +326,23 @@ class PointerViewSet(viewsets.ModelViewSet):
             return [IsAdminUser()]
         return [IsAuthenticated()]
 
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        """
+        Download the uploaded files of the pointer as a ZIP archive,
+        with one folder per element.
+        Only files the user may download (staff, assigned or shared) are included,
+        404 if there are none.
+        """
+        pointer = self.get_object()
+        entries = attachment_entries(Q(element__pointer=pointer), AccessControl.for_request(request), 2)
+        response = serve_zip(entries, f"{pointer.title}.zip")
+        if response:
+            return response
+        return Response({"detail": "No files to download."}, status=status.HTTP_404_NOT_FOUND)
+
 
-class ElementViewSet(viewsets.ModelViewSet):
+class ElementViewSet(PendingDeletionMixin, viewsets.ModelViewSet):
     """
     ViewSet for Element model.
     Admin: Full CRUD operations
@@ -382,6 +357,7 @@ class ElementViewSet(viewsets.ModelViewSet):
 
     queryset = Element.objects.all()
     serializer_class = ElementSerializer
+    pending_deletion_lookups = ["standard__pending_deletion", "academic_year__pending_deletion"]
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ["pointer"]
@@ -394,8 +370,22 @@ class ElementViewSet(viewsets.ModelViewSet):
             return [IsAdminUser()]
         return [IsAuthenticated()]
 
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        """
+        Download the uploaded files of the element as a ZIP archive.
+        Only files the user may download (staff, assigned or shared) are included,
+        404 if there are none.
+        """
+        element = self.get_object()
+        entries = attachment_entries(Q(element=element), AccessControl.for_request(request), 3)
+        response = serve_zip(entries, f"{element.title}.zip")
+        if response:
+            return response
+        return Response({"detail": "No files to download."}, status=status.HTTP_404_NOT_FOUND)
+
 
-class AttachmentViewSet(viewsets.ModelViewSet):
+class AttachmentViewSet(PendingDeletionMixin, viewsets.ModelViewSet):
     """
     ViewSet for Attachment model.
     Admin: Full CRUD operations
@@ -406,11 +396,16 @@ class AttachmentViewSet(viewsets.ModelViewSet):
     - Filter by element
     - Sort by created_at
     - Search by title
-    - Pagination
+    - Pagination (estimated count on large results)
     """
 
     queryset = Attachment.objects.all()
     serializer_class = AttachmentSerializer
+    pagination_class = EstimatedCountPagination
+    pending_deletion_lookups = [
+        "standard__pending_deletion",
+        "academic_year__pending_deletion",
+    ]
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ["element"]
@@ -443,13 +438,16 @@ class AttachmentViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         """
         If a file is provided, set uploaded_by
+        The row is locked so the replaced file is released exactly once.
         """
         file = self.request.FILES.get("file")
 
-        if file:
-            serializer.save(uploaded_by=self.request.user)
-        else:
-            serializer.save()
+        with transaction.atomic():
+            serializer.instance = Attachment.objects.select_for_update().get(pk=serializer.instance.pk)
+            if file:
+                serializer.save(uploaded_by=self.request.user)
+            else:
+                serializer.save()
 
     @action(detail=True, methods=["post", "get"])
     def upload(self, request, pk=None):
@@ -465,20 +463,22 @@ class AttachmentViewSet(viewsets.ModelViewSet):
             )
 
         attachment = self.get_object()
-        standard = attachment.element.pointer.standard
 
-        if attachment.file:
-            return Response(
-                {"detail": "Attachment already has a file."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        with transaction.atomic():
+            # Concurrent uploads and removals of the attachment are applied one after the other
+            attachment = Attachment.objects.select_for_update().get(pk=attachment.pk)
+            if attachment.file:
+                return Response(
+                    {"detail": "Attachment already has a file."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
-        if request.user in standard.assigned_to.all() or request.user.is_staff:
-            attachment.file = file
-            attachment.uploaded_by = request.user
-            attachment.save()
-            serializer = self.get_serializer(attachment)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            if AccessControl.for_request(request).can_modify_attachment(attachment):
+                attachment.file = file
+                attachment.uploaded_by = request.user
+                attachment.save()
+                serializer = self.get_serializer(attachment)
+                return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         return Response(
             {"detail": "You are not assigned to this standard."},
@@ -492,13 +492,14 @@ class AttachmentViewSet(viewsets.ModelViewSet):
         Only users assigned to the standard or admins can remove.
         """
         attachment = self.get_object()
-        standard = attachment.element.pointer.standard
 
-        if request.user in standard.assigned_to.all() or request.user.is_staff:
-            if attachment.file:
-                attachment.file.delete(save=True)
-            attachment.uploaded_by = None
-            attachment.save()
+        if AccessControl.for_request(request).can_modify_attachment(attachment):
+            with transaction.atomic():
+                # Only the removal that finds the file releases it (see signals.file_changed)
+                attachment = Attachment.objects.select_for_update().get(pk=attachment.pk)
+                attachment.file = None
+                attachment.uploaded_by = None
+                attachment.save()
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {"detail": "You are not assigned to this standard."},
@@ -515,18 +516,15 @@ class AttachmentViewSet(viewsets.ModelViewSet):
         3. They are admins
         """
         attachment = self.get_object()
-        standard = attachment.element.pointer.standard
 
         # Check permissions
-        if request.user in standard.assigned_to.all() or request.user in attachment.shared_with.all() or request.user.is_staff:
+        if AccessControl.for_request(request).can_download_attachment(attachment):
 
             if not attachment.file:
                 return Response({"detail": "No file attached."}, status=status.HTTP_404_NOT_FOUND)
 
-            file_path = os.path.join(settings.MEDIA_ROOT, attachment.file.name)
-            if os.path.exists(file_path):
-                response = FileResponse(open(file_path, "rb"))
-                response["Content-Disposition"] = f'attachment; filename="{os.path.basename(file_path)}"'
+            response = serve_file(request, attachment.file)
+            if response:
                 return response
             return Response({"detail": "File not found."}, status=status.HTTP_404_NOT_FOUND)
         return Response(
@@ -534,8 +532,132 @@ class AttachmentViewSet(viewsets.ModelViewSet):
             status=status.HTTP_403_FORBIDDEN,
         )
 
+    @action(detail=False, methods=["post"], url_path="signed-urls")
+    def signed_urls(self, request):
+        """
+        Issue short-lived signed download URLs for a list of attachment ids ({"ids": [...]}).
+        The URLs download without authentication until they expire (SIGNED_DOWNLOAD_MAX_AGE).
+        Attachments without a file or that the user may not download are left out.
+        """
+        ids = serializers.ListField(child=serializers.UUIDField()).run_validation(request.data.get("ids"))
+
+        access = AccessControl.for_request(request)
+        attachments = self.get_queryset().filter(id__in=ids, has_file=True)
+        urls = {
+            str(attachment.id): signed_download_url(request, attachment.file, attachment.id, request.user)
+            for attachment in attachments
+            if access.can_download_attachment(attachment)
+        }
+        return Response({"urls": urls})
 
-class RequestViewSet(viewsets.ModelViewSet):
+
+class UploadSessionViewSet(
+    PendingDeletionMixin,
+    mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet
+):
+    """
+    ViewSet for resumable chunked uploads of Attachment and CourseAttachment files.
+
+    - POST /uploads/ creates a session for an attachment (or a course file)
+      with the file name, size and SHA-256 checksum of the file
+    - PUT /uploads/{id}/chunk/ appends the request body at the Upload-Offset header
+    - GET /uploads/{id}/ returns the offset to resume from after a disconnect
+    - POST /uploads/{id}/finalize/ verifies the checksum and stores the file
+    - DELETE /uploads/{id}/ aborts the upload
+
+    Users only see their own sessions (admins see all).
+    """
+
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+    pending_deletion_lookups = [
+        "attachment__standard__pending_deletion",
+        "attachment__academic_year__pending_deletion",
+        "course_file__course__academic_year__pending_deletion",
+    ]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(created_by=self.request.user)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        """
+        Start an upload. Same rules as the upload actions: users assigned to the
+        standard (or admins) upload to an empty attachment, the professor of the
+        course (or admins) upload to a course file.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        attachment = serializer.validated_data.get("attachment")
+        course_file = serializer.validated_data.get("course_file")
+
+        if attachment:
+            if attachment.file:
+                return Response({"detail": "Attachment already has a file."}, status=status.HTTP_400_BAD_REQUEST)
+            if not AccessControl.for_request(request).can_modify_attachment(attachment):
+                return Response({"detail": "You are not assigned to this standard."}, status=status.HTTP_403_FORBIDDEN)
+        else:
+            course_file = CourseFile.objects.select_related("course").get(pk=course_file.pk)
+            if not AccessControl.for_request(request).can_modify_course_file(course_file):
+                return Response({"detail": "You are not the professor of this course."}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer.save(created_by=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def perform_destroy(self, instance):
+        if os.path.exists(instance.part_path):
+            os.unlink(instance.part_path)
+        instance.delete()
+
+    @action(detail=True, methods=["put"])
+    def chunk(self, request, pk=None):
+        """
+        Append the raw request body to the upload, starting at the Upload-Offset header.
+        A chunk that does not start at the current offset gets 409 with the offset to resume from,
+        as does a chunk sent while another one is being written.
+        """
+        session = self.get_object()
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+        except ValueError:
+            return Response({"detail": "The Upload-Offset header is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            append_chunk(session, offset, request.stream)
+        except OffsetMismatch as e:
+            return Response({"detail": str(e), "offset": e.offset}, status=status.HTTP_409_CONFLICT)
+        except ChunkInProgress as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+        except UploadTooLarge as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        session.refresh_from_db()
+        response = Response(self.get_serializer(session).data)
+        response["Upload-Offset"] = str(session.offset)
+        return response
+
+    @action(detail=True, methods=["post"])
+    def finalize(self, request, pk=None):
+        """
+        Verify the checksum of the complete upload and store the file.
+        Returns the updated attachment (or the new course attachment).
+        """
+        session = self.get_object()
+        try:
+            target = finalize_upload(session, request.user)
+        except UploadForbidden as e:
+            return Response({"detail": str(e)}, status=status.HTTP_403_FORBIDDEN)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer_class = AttachmentSerializer if isinstance(target, Attachment) else CourseAttachmentSerializer
+        return Response(serializer_class(target, context=self.get_serializer_context()).data, status=status.HTTP_201_CREATED)
+
+
+class RequestViewSet(PendingDeletionMixin, viewsets.ModelViewSet):
     """
     ViewSet for Request model.
     Admin: Full CRUD operations, Approve/Reject/Cancel
@@ -548,10 +670,16 @@ class RequestViewSet(viewsets.ModelViewSet):
     - Filter by status, requester, receiver
     - Sort by created_at
     - Search by requester, receiver
-    - Pagination
+    - Pagination (estimated count on large results)
     """
 
     queryset = Request.objects.all()
+    pagination_class = EstimatedCountPagination
+    # Requests outlive their attachment (made_on is set to null on purge)
+    pending_deletion_lookups = [
+        "made_on__standard__pending_deletion",
+        "made_on__academic_year__pending_deletion",
+    ]
 
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ["status", "requester", "receiver"]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 13:06
+
+import QAU_API.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='id',
+            field=models.UUIDField(default=QAU_API.ids.uuid7, primary_key=True, serialize=False),
+        ),
+    ]
@@ -1,7 +1,6 @@
-import uuid
-
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from QAU_API.ids import uuid7
 
 
 class User(AbstractUser):
@@ -15,7 +14,7 @@ class User(AbstractUser):
         PROFESSOR = "PROFESSOR", "Professor"
         TA = "TA", "Teaching Assistant"
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    id = models.UUIDField(primary_key=True, default=uuid7)
     email = models.EmailField(unique=True, max_length=150)
     role = models.CharField(max_length=10, choices=Role.choices, verbose_name="Role")
 
@@ -24,6 +24,7 @@ class UserViewSet(ModelViewSet):
     filterset_fields = ["role"]
     ordering_fields = ["username", "last_login", "date_joined"]
     search_fields = ["username"]
+    cursor_ordering = ["-date_joined", "-id"]
 
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
     def me(self, request):